@@ -17,6 +17,7 @@ class Patch:
     tile_path: Optional[Path] = None
     thumb_path: Optional[Path] = None
     orig_label: Optional[str] = None          # ← 新增：原始类别，用于“未复核”判断
+    thumb_exists: bool = True                 # 载入时批量判定，视图不再逐行 stat
     extra: Dict = field(default_factory=dict)
 
 @dataclass
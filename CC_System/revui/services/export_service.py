@@ -1,8 +1,36 @@
 from __future__ import annotations
 from pathlib import Path
 from typing import List, Dict, Tuple
-import json, csv, shutil, time
+import json, csv, os, shutil, time
+from concurrent.futures import ThreadPoolExecutor
 from revui.models.types import Patch, SlideMeta
+from revui.services import jsonio
+
+# numpy 可选：有则用列式掩码批量过滤，无则逐对象判断
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# detections_reviewed.csv 的列顺序（csv.writer 按位置写，跳过 DictWriter 的逐行 dict→list 转换）
+CSV_FIELDS = (
+    "tif_id", "tile_id", "patch_id", "x", "y", "w", "h",
+    "score", "label", "tile_path", "orig_label",
+)
+
+
+def _fast_copy(src: Path, dst: Path):
+    """只复制文件内容，不同步元数据。
+
+    shutil.copyfile 在 Linux 走 sendfile 零拷贝、macOS 走 fcopyfile；
+    相比 copy2 省掉每个文件的 stat/utime/chmod。复核导出的 tile 不需要
+    保留原始元数据。
+    """
+    try:
+        shutil.copyfile(src, dst)
+    except shutil.SameFileError:
+        pass
+
 
 class ExportService:
     def __init__(self, labels: List[str]):
@@ -34,94 +62,126 @@ class ExportService:
         """
         out_dir.mkdir(parents=True, exist_ok=True)
 
-        def _is_hidden(p: Patch) -> bool:
-            if hidden_predicate is None:
-                return False
-            try:
-                return bool(hidden_predicate(p.patch_id))
-            except Exception:
-                return False
-
         def _changed(p: Patch) -> bool:
             return (p.orig_label is not None) and (p.label != p.orig_label)
 
+        # 隐藏集合一次性批量算好，过滤时只做 set 成员判断，
+        # 不再每个 patch 一次谓词调用 + try/except
+        hidden: set = set()
+        if hidden_predicate is not None and not include_hidden:
+            try:
+                hidden = {p.patch_id for p in patches if hidden_predicate(p.patch_id)}
+            except Exception:
+                hidden = set()
+
         # 过滤列表
-        ex = []
-        for p in patches:
-            if not include_hidden and _is_hidden(p):
-                continue
-            if only_changed and (not _changed(p)):
-                continue
-            ex.append(p)
+        # only_changed 时先抽出 label/orig_label 两列（SoA），一次向量化比较出掩码，
+        # 避免对上千个 Patch 逐对象做属性查找 + 两次比较
+        changed_mask = None
+        if only_changed and np is not None and patches:
+            labels = np.array([p.label for p in patches], dtype=object)
+            origs = np.array([p.orig_label for p in patches], dtype=object)
+            changed_mask = np.not_equal(origs, None) & np.not_equal(labels, origs)
+
+        if changed_mask is not None:
+            ex = [p for i, p in enumerate(patches)
+                  if changed_mask[i] and p.patch_id not in hidden]
+        else:
+            ex = [p for p in patches
+                  if p.patch_id not in hidden
+                  and (not only_changed or _changed(p))]
+
+        # tile_path 只字符串化一次，CSV / JSON 两个 writer 共用
+        tile_strs = [str(p.tile_path) if p.tile_path else "" for p in ex]
 
         # 写 detections_reviewed.csv
         if write_csv:
             csv_path = out_dir / "detections_reviewed.csv"
-            with csv_path.open("w", newline="", encoding="utf-8") as f:
-                w = csv.DictWriter(f, fieldnames=[
-                    "tif_id","tile_id","patch_id","x","y","w","h",
-                    "score","label","tile_path","orig_label"
-                ])
-                w.writeheader()
-                for p in ex:
-                    w.writerow({
-                        "tif_id": p.tif_id, "tile_id": p.tile_id, "patch_id": p.patch_id,
-                        "x": p.x, "y": p.y, "w": p.w, "h": p.h,
-                        "score": p.score, "label": p.label,
-                        "tile_path": str(p.tile_path) if p.tile_path else "",
-                        "orig_label": p.orig_label or "",
-                    })
+            # 固定 schema 下字段正常不含逗号/引号/换行；先快速预扫一遍，
+            # 干净时直接 f-string 拼行一次性写出，跳过 csv 模块的通用转义
+            needs_quoting = any(
+                ("," in s or '"' in s or "\n" in s or "\r" in s)
+                for p, tp in zip(ex, tile_strs)
+                for s in (str(p.tif_id), str(p.tile_id), p.patch_id,
+                          p.label, tp, p.orig_label or "")
+            )
+            if not needs_quoting:
+                lines = [",".join(CSV_FIELDS) + "\n"]
+                lines.extend(
+                    f"{p.tif_id},{p.tile_id},{p.patch_id},{p.x},{p.y},{p.w},{p.h},"
+                    f"{p.score},{p.label},{tp},{p.orig_label or ''}\n"
+                    for p, tp in zip(ex, tile_strs)
+                )
+                csv_path.write_text("".join(lines), encoding="utf-8", newline="")
+            else:
+                # 兜底：字段含特殊字符时仍走 csv.writer 的正确转义
+                # csv 按行写出，默认 8 KiB 缓冲在几万行时意味着成千上万次
+                # write() 系统调用；放大到 4 MiB 让内核每次看到一大块
+                with csv_path.open("w", newline="", encoding="utf-8",
+                                   buffering=4 * 1024 * 1024) as f:
+                    w = csv.writer(f)
+                    w.writerow(CSV_FIELDS)
+                    w.writerows(
+                        (p.tif_id, p.tile_id, p.patch_id, p.x, p.y, p.w, p.h,
+                         p.score, p.label, tp, p.orig_label or "")
+                        for p, tp in zip(ex, tile_strs)
+                    )
 
         # 写 detections_reviewed.json（可选）
         if write_json:
             js = []
-            for p in ex:
+            for p, tp in zip(ex, tile_strs):
                 js.append({
                     "tif_id": p.tif_id, "tile_id": p.tile_id, "patch_id": p.patch_id,
                     "x": p.x, "y": p.y, "w": p.w, "h": p.h,
                     "score": p.score, "label": p.label,
-                    "tile_path": str(p.tile_path) if p.tile_path else "",
+                    "tile_path": tp,
                     "orig_label": p.orig_label or "",
                 })
-            (out_dir / "detections_reviewed.json").write_text(
-                json.dumps(js, ensure_ascii=False, indent=2), encoding="utf-8"
-            )
+            (out_dir / "detections_reviewed.json").write_bytes(jsonio.dumps_bytes(js))
 
         # 写 slide_meta_reviewed.json
-        (out_dir / "slide_meta_reviewed.json").write_text(
-            json.dumps({
-                "tif_id": meta.tif_id,
-                "slide_pred_label": meta.slide_pred_label,
-                "slide_pred_scores": meta.slide_pred_scores,
-                "source_priority": meta.source_priority,
-                "export_time": time.strftime("%Y-%m-%d %H:%M:%S"),
-            }, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
+        (out_dir / "slide_meta_reviewed.json").write_bytes(jsonio.dumps_bytes({
+            "tif_id": meta.tif_id,
+            "slide_pred_label": meta.slide_pred_label,
+            "slide_pred_scores": meta.slide_pred_scores,
+            "source_priority": meta.source_priority,
+            "export_time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }))
 
-        # 写 changes.log.json
-        (out_dir / "changes.log.json").write_text(
-            json.dumps(changes, ensure_ascii=False, indent=2), encoding="utf-8"
+        # 写 changes.log.json（无改动时直接写空数组字面量，跳过序列化）
+        (out_dir / "changes.log.json").write_bytes(
+            jsonio.dumps_bytes(changes) if changes else b"[]"
         )
 
         # 可选：拷贝 tile 到 tiles_reviewed/<label>/
         if copy_tiles:
             base = out_dir / "tiles_reviewed"
+            # 先收集 (src, dst) 对，label 子目录去重后一次性创建
+            pairs: List[Tuple[Path, Path]] = []
+            labels_needed = set()
             for p in ex:
                 if not p.tile_path:
                     continue
-                src = Path(p.tile_path)
+                # tile_path 正常已是 Path，避免无谓的重新构造
+                src = p.tile_path if isinstance(p.tile_path, Path) else Path(p.tile_path)
                 if not src.exists():
                     continue
-                sub = base / p.label
-                sub.mkdir(parents=True, exist_ok=True)
                 fname = f"{p.tif_id}_{p.tile_id}_{p.patch_id.replace(':','_')}_{p.score:.2f}{src.suffix or '.png'}"
-                dst = sub / fname
-                # 同名覆盖
+                pairs.append((src, base / p.label / fname))
+                labels_needed.add(p.label)
+            for lbl in labels_needed:
+                (base / lbl).mkdir(parents=True, exist_ok=True)
+
+            def _copy_one(pair: Tuple[Path, Path]):
+                # 同名覆盖；单个失败不影响整体导出
                 try:
-                    shutil.copy2(src, dst)
+                    _fast_copy(pair[0], pair[1])
                 except Exception:
-                    # 兜底：copy 而不带元数据
-                    try:
-                        shutil.copy(src, dst)
-                    except Exception:
-                        pass
+                    pass
+
+            # 多线程重叠单文件拷贝延迟（小 tile 多时主要耗在 syscall 等待）
+            if pairs:
+                workers = min(32, (os.cpu_count() or 4) * 4)
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    list(pool.map(_copy_one, pairs))
@@ -0,0 +1,21 @@
+from __future__ import annotations
+import json
+
+# orjson（C 实现）可用时优先，序列化快 5-10x 且直接产出 bytes；
+# 未安装时退回标准库，行为保持一致（indent=2，保留非 ASCII 字符）。
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_bytes(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
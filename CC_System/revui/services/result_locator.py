@@ -1,7 +1,11 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import Optional, Dict, Any, List
-import csv, json, yaml
+from typing import Optional, Dict, Any, List, Tuple
+import csv, json, os, yaml
+from revui.services import jsonio
+
+# 有 libyaml 时用 C 加速的 loader，没有则退回纯 Python SafeLoader
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 class ResultLocator:
     """
@@ -12,28 +16,66 @@ class ResultLocator:
     """
     def __init__(self, cfg_path: Path):
         self.cfg_path = Path(cfg_path)
-        self.cfg = yaml.safe_load(self.cfg_path.read_text(encoding="utf-8"))
+        self.cfg = self._load_cfg(self.cfg_path)
         io = self.cfg.get("io", {})
         self.results_root = Path(io.get("results_root", "./results")).resolve()
         self.manifest_path = io.get("manifest")  # 可为 str 或 None
         self.patterns: List[str] = io.get("patterns", ["{stem}_pred", "{stem}"])
+        # manifest 索引缓存：{manifest路径: (mtime_ns, {resolved tif_path: result_dir})}
+        self._manifest_cache: Dict[str, Tuple[int, Dict[str, str]]] = {}
+
+    @staticmethod
+    def _load_cfg(cfg_path: Path) -> Dict[str, Any]:
+        """解析 config，带 mtime 校验的 JSON 旁路缓存。
+
+        YAML 解析较慢且配置很少变化：命中缓存时直接 json.loads，
+        未命中才走 yaml 并原子写回缓存（写失败不影响加载）。
+        """
+        cache_path = cfg_path.with_suffix(cfg_path.suffix + ".cache.json")
+        try:
+            mtime_ns = cfg_path.stat().st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        if mtime_ns is not None and cache_path.exists():
+            try:
+                cached = json.loads(cache_path.read_text(encoding="utf-8"))
+                if cached.get("mtime_ns") == mtime_ns:
+                    return cached["cfg"]
+            except Exception:
+                pass
+        cfg = yaml.load(cfg_path.read_text(encoding="utf-8"), Loader=_YAML_LOADER)
+        if mtime_ns is not None:
+            try:
+                tmp = cache_path.with_name(cache_path.name + ".tmp")
+                tmp.write_text(
+                    json.dumps({"mtime_ns": mtime_ns, "cfg": cfg}, ensure_ascii=False),
+                    encoding="utf-8",
+                )
+                os.replace(tmp, cache_path)
+            except Exception:
+                pass
+        return cfg
 
     def locate(self, tif_path: Path) -> Optional[Path]:
+        # resolve() 会触碰文件系统做符号链接解析——只在入口做一次，
+        # 后续 manifest 查找直接复用已解析的路径
         tif_path = Path(tif_path).resolve()
         stem = tif_path.stem
         parent = tif_path.parent
 
-        # a) 同名目录（同级）
-        cand = [
-            parent / f"{stem}_pred",
-            parent / stem,
-        ]
+        # a) 同名目录（同级）：先一次 scandir 列出父目录成员，
+        # 绝大多数 miss 不再对每个候选逐个 stat
+        try:
+            with os.scandir(parent) as it:
+                siblings = {e.name for e in it}
+        except OSError:
+            siblings = set()
+        for name in (f"{stem}_pred", stem):
+            if name in siblings and self._looks_like_result_dir(parent / name):
+                return (parent / name).resolve()
+
         # a+) 同名目录（results_root 下）
-        cand += [
-            self.results_root / f"{stem}",
-            self.results_root / f"{stem}_pred",
-        ]
-        for c in cand:
+        for c in (self.results_root / f"{stem}", self.results_root / f"{stem}_pred"):
             if self._looks_like_result_dir(c):
                 return c.resolve()
 
@@ -53,14 +95,18 @@ class ResultLocator:
 
     # 结果目录判定：存在 detections.(json|csv)
     def _looks_like_result_dir(self, d: Path) -> bool:
-        if not d or not d.exists() or not d.is_dir():
+        # 一次 scandir 同时覆盖“目录存在 + 是目录 + 含 detections 文件”，
+        # 替代原来的 exists/is_dir/exists/exists 四次 stat
+        if not d:
+            return False
+        try:
+            with os.scandir(d) as it:
+                return any(e.name in ("detections.json", "detections.csv") for e in it)
+        except (NotADirectoryError, OSError):
             return False
-        for nm in ("detections.json", "detections.csv"):
-            if (d / nm).exists():
-                return True
-        return False
 
     def _from_manifest(self, tif_path: Path) -> Optional[Path]:
+        # tif_path 已在 locate() 入口 resolve 过
         # 优先 config 指定的 manifest
         if self.manifest_path:
             mp = Path(self.manifest_path)
@@ -79,7 +125,33 @@ class ResultLocator:
         return None
 
     def _read_manifest(self, mp: Path, tif_path: Path) -> Optional[Path]:
-        sp = str(tif_path.resolve())
+        idx = self._manifest_index(mp)
+        v = idx.get(str(tif_path))
+        return Path(v) if v else None
+
+    def _manifest_index(self, mp: Path) -> Dict[str, str]:
+        """manifest -> {resolved tif_path: result_dir}，按 mtime 缓存一次构建。"""
+        try:
+            mtime_ns = mp.stat().st_mtime_ns
+        except OSError:
+            return {}
+        cached = self._manifest_cache.get(str(mp))
+        if cached and cached[0] == mtime_ns:
+            return cached[1]
+
+        # 进程内未命中：先试磁盘 sidecar（跨进程/跨启动复用，mtime 校验）
+        idx_path = mp.with_name(mp.name + ".idx.json")
+        try:
+            if idx_path.exists():
+                data = jsonio.loads(idx_path.read_bytes())
+                if data.get("mtime_ns") == mtime_ns:
+                    idx = data["index"]
+                    self._manifest_cache[str(mp)] = (mtime_ns, idx)
+                    return idx
+        except Exception:
+            pass
+
+        idx: Dict[str, str] = {}
         if mp.suffix.lower() == ".csv":
             with mp.open("r", newline="", encoding="utf-8") as f:
                 for row in csv.DictReader(f):
@@ -90,19 +162,26 @@ class ResultLocator:
                     if not k or not v:
                         continue
                     # 绝对/相对兼容
-                    if Path(k).resolve() == tif_path.resolve():
-                        return Path(v)
+                    idx[str(Path(k).resolve())] = v
         else:
             data = json.loads(mp.read_text(encoding="utf-8"))
             # 既支持 {tif_path: result_dir} 也支持 list[{"tif_path":..., "result_dir":...}]
             if isinstance(data, dict):
                 for k, v in data.items():
-                    if Path(k).resolve() == tif_path.resolve():
-                        return Path(v)
+                    idx[str(Path(k).resolve())] = str(v)
             elif isinstance(data, list):
                 for it in data:
                     k = it.get("tif_path") or it.get("slide")
                     v = it.get("result_dir") or it.get("results")
-                    if k and v and Path(k).resolve() == tif_path.resolve():
-                        return Path(v)
-        return None
+                    if k and v:
+                        idx[str(Path(k).resolve())] = str(v)
+
+        self._manifest_cache[str(mp)] = (mtime_ns, idx)
+        # 写回 sidecar，下次进程启动直接 loads（写失败不影响定位）
+        try:
+            tmp = idx_path.with_name(idx_path.name + ".tmp")
+            tmp.write_bytes(jsonio.dumps_bytes({"mtime_ns": mtime_ns, "index": idx}))
+            os.replace(tmp, idx_path)
+        except Exception:
+            pass
+        return idx
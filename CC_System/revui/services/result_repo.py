@@ -1,10 +1,21 @@
 from __future__ import annotations
 import csv
 import json
+import os
+import sys
 from pathlib import Path
 from typing import List, Tuple, Optional
 
 from revui.models.types import Patch, SlideMeta
+from revui.services import jsonio
+from revui.services.export_service import CSV_FIELDS
+
+# pyarrow 可选：detections.csv 用 C 解析器读，比 DictReader 快一个量级
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa_csv = None
 
 
 class ResultRepo:
@@ -38,28 +49,56 @@ class ResultRepo:
         if p.suffix.lower() == ".json":
             data = json.loads(p.read_text(encoding="utf-8"))
             rows = data if isinstance(data, list) else data.get("detections", [])
+        elif pa_csv is not None:
+            # 整表 C 侧解析，再转行字典（Patch.extra 需要整行）。列类型
+            # 显式给定而不靠推断："0123" 这种补零 id 被推断成 int 会丢
+            # 前导零，和 DictReader 兜底路径读出的数据不一致
+            convert = pa_csv.ConvertOptions(column_types={
+                "tif_id": pa.string(), "tile_id": pa.string(),
+                "label": pa.string(), "tile_path": pa.string(),
+                "x": pa.int32(), "y": pa.int32(),
+                "w": pa.int32(), "h": pa.int32(),
+                "score": pa.float64(),
+            })
+            rows = pa_csv.read_csv(p, convert_options=convert).to_pylist()
         else:
             rows = []
             with p.open("r", newline="", encoding="utf-8") as f:
                 reader = csv.DictReader(f); rows.extend(reader)
 
+        # tiles 目录一次 scandir 建名字集合：缩略图存在性按集合判定，
+        # 视图侧不再对每个 patch 做一次 stat（网络盘上尤其致命）
+        try:
+            with os.scandir(tiles_dir) as it:
+                tile_names = {e.name for e in it}
+        except OSError:
+            tile_names = None
+
         patches: List[Patch] = []
         for i, r in enumerate(rows):
-            get = lambda k, d=None: r.get(k) if isinstance(r, dict) else None
-            tif_id = str(get("tif_id") or get("slide_id") or "")
-            tile_id = str(get("tile_id") or i)
-            x = int(float(get("x", 0))); y = int(float(get("y", 0)))
-            w = int(float(get("w", 0))); h = int(float(get("h", 0)))
-            score = float(get("score", 0)); label = str(get("label") or "ASCUS")
-            tile_rel = get("tile_path")
+            # rows 统一为 dict 列表，直接 r.get，不再每行构造取值闭包
+            if not isinstance(r, dict):
+                continue
+            tif_id = str(r.get("tif_id") or r.get("slide_id") or "")
+            tile_id = str(r.get("tile_id") or i)
+            x = int(float(r.get("x", 0))); y = int(float(r.get("y", 0)))
+            w = int(float(r.get("w", 0))); h = int(float(r.get("h", 0)))
+            # intern：标签取值集合很小，去重后视图分桶可走快路径
+            score = float(r.get("score", 0)); label = sys.intern(str(r.get("label") or "ASCUS"))
+            tile_rel = r.get("tile_path")
             patch_id = f"{tif_id}:{tile_id}:{i}"
             tile_path = Path(tile_rel) if tile_rel else (tiles_dir / f"{tile_id}.png")
             thumb_path = tile_path
+            # tiles 目录内按名字集合判定；目录外的自定义路径不预判，交给解码兜底
+            if tile_names is not None and thumb_path.parent == tiles_dir:
+                thumb_exists = thumb_path.name in tile_names
+            else:
+                thumb_exists = True
             patches.append(Patch(
                 patch_id=patch_id, tif_id=tif_id, tile_id=tile_id,
                 x=x, y=y, w=w, h=h, score=score, label=label,
                 tile_path=tile_path, thumb_path=thumb_path, orig_label=label,
-                extra=r
+                thumb_exists=thumb_exists, extra=r
             ))
         return patches
 
@@ -90,23 +129,24 @@ class ResultRepo:
     def save_reviewed(self, out_dir: Path, patches: List[Patch], meta: SlideMeta, changes: List[dict]):
         out_dir.mkdir(parents=True, exist_ok=True)
         det_csv = out_dir / "detections_reviewed.csv"
-        with det_csv.open("w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=[
-                "tif_id","tile_id","patch_id","x","y","w","h","score","label","tile_path","orig_label"
-            ])
-            writer.writeheader()
-            for p in patches:
-                writer.writerow({
-                    "tif_id": p.tif_id, "tile_id": p.tile_id, "patch_id": p.patch_id,
-                    "x": p.x, "y": p.y, "w": p.w, "h": p.h, "score": p.score,
-                    "label": p.label, "tile_path": str(p.tile_path) if p.tile_path else "",
-                    "orig_label": p.orig_label or ""
-                })
-        (out_dir / "slide_meta_reviewed.json").write_text(
-            json.dumps({
-                "tif_id": meta.tif_id,
-                "slide_pred_label": meta.slide_pred_label,
-                "slide_pred_scores": meta.slide_pred_scores,
-                "source_priority": meta.source_priority,
-            }, ensure_ascii=False, indent=2), encoding="utf-8")
-        (out_dir / "changes.log.json").write_text(json.dumps(changes, ensure_ascii=False, indent=2), encoding="utf-8")
+        # 同 ExportService：csv 按行写出，大缓冲避免逐行 write() 系统调用
+        with det_csv.open("w", newline="", encoding="utf-8",
+                          buffering=4 * 1024 * 1024) as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_FIELDS)
+            writer.writerows(
+                (p.tif_id, p.tile_id, p.patch_id, p.x, p.y, p.w, p.h,
+                 p.score, p.label,
+                 str(p.tile_path) if p.tile_path else "",
+                 p.orig_label or "")
+                for p in patches
+            )
+        (out_dir / "slide_meta_reviewed.json").write_bytes(jsonio.dumps_bytes({
+            "tif_id": meta.tif_id,
+            "slide_pred_label": meta.slide_pred_label,
+            "slide_pred_scores": meta.slide_pred_scores,
+            "source_priority": meta.source_priority,
+        }))
+        (out_dir / "changes.log.json").write_bytes(
+            jsonio.dumps_bytes(changes) if changes else b"[]"
+        )
@@ -1,4 +1,5 @@
 from __future__ import annotations
+from contextlib import contextmanager
 from typing import List, Dict, Callable, Tuple, Set
 from datetime import datetime
 from revui.models.types import Patch, SlideMeta
@@ -6,11 +7,14 @@ from revui.models.types import Patch, SlideMeta
 class ReviewManager:
     def __init__(self, reviewer: str = "anonymous"):
         self._patches: List[Patch] = []
+        self._by_id: Dict[str, Patch] = {}   # patch_id -> Patch，O(1) 定位
         self._meta: SlideMeta | None = None
         self._changes: List[Dict] = []
         self._undo_stack: List[Dict] = []
         self._redo_stack: List[Dict] = []
         self._hidden_ids: Set[str] = set()   # ← 软删除集合
+        self._emit_depth = 0                 # batch() 嵌套深度
+        self._dirty = False                  # batch 期间是否有待通知的变更
         self.reviewer = reviewer
 
         self.on_changed: List[Callable[[], None]] = []
@@ -18,6 +22,7 @@ class ReviewManager:
 
     def set_data(self, patches: List[Patch], meta: SlideMeta):
         self._patches = patches
+        self._by_id = {p.patch_id: p for p in patches}
         self._meta = meta
         self._changes.clear()
         self._undo_stack.clear()
@@ -31,6 +36,21 @@ class ReviewManager:
     def changes(self) -> List[Dict]:
         return list(self._changes)
 
+    def get_patch_by_id(self, patch_id: str) -> Patch | None:
+        return self._by_id.get(patch_id)
+
+    @contextmanager
+    def batch(self):
+        """挂起回调通知：with mgr.batch() 内的多次变更合并为结束时一次 _emit。"""
+        self._emit_depth += 1
+        try:
+            yield self
+        finally:
+            self._emit_depth -= 1
+            if self._emit_depth == 0 and self._dirty:
+                self._dirty = False
+                self._emit()
+
     # --- 改类 ---
     def move_class(self, patch_id: str, new_label: str):
         p = self._find(patch_id)
@@ -49,6 +69,29 @@ class ReviewManager:
         self._redo_stack.clear()
         self._emit()
 
+    def bulk_move_class(self, patch_ids: List[str], new_label: str):
+        """批量改类：共享同一时间戳，整批只触发一次回调。"""
+        ts = datetime.now().isoformat(timespec="seconds")
+        moved = False
+        for pid in patch_ids:
+            p = self._by_id.get(pid)
+            if not p or p.label == new_label:
+                continue
+            rec = {
+                "patch_id": pid,
+                "old_label": p.label,
+                "new_label": new_label,
+                "reviewer": self.reviewer,
+                "timestamp": ts,
+            }
+            p.label = new_label
+            self._changes.append(rec)
+            self._undo_stack.append(rec)
+            moved = True
+        if moved:
+            self._redo_stack.clear()
+            self._emit()
+
     # --- 软删除 / 恢复 ---
     def hide(self, patch_id: str):
         if patch_id in self._hidden_ids: return
@@ -90,12 +133,12 @@ class ReviewManager:
 
     # --- 内部 ---
     def _find(self, patch_id: str) -> Patch | None:
-        for p in self._patches:
-            if p.patch_id == patch_id:
-                return p
-        return None
+        return self._by_id.get(patch_id)
 
     def _emit(self):
+        if self._emit_depth > 0:
+            self._dirty = True
+            return
         for cb in self.on_changed:
             cb()
         for cb in self.on_undo_redo:
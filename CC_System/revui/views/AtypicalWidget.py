@@ -1,9 +1,24 @@
 from __future__ import annotations
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
+import sys
 import yaml
 
-from PySide6.QtCore import Qt, QSize, Signal, QModelIndex, QSortFilterProxyModel
-from PySide6.QtGui import QIcon, QPixmap, QAction, QKeySequence, QStandardItemModel, QStandardItem
+# 有 libyaml 时用 C 加速 loader（与 services.result_locator 同一做法）
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+from PySide6.QtCore import (
+    Qt, QSize, Signal, QModelIndex, QSortFilterProxyModel, QTimer,
+    QRunnable, QThreadPool
+)
+from PySide6.QtGui import (
+    QIcon, QPixmap, QPixmapCache, QImage, QAction, QKeySequence,
+    QStandardItemModel, QStandardItem
+)
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QSplitter, QTabWidget, QListView, QAbstractItemView,
     QPushButton, QLabel, QLineEdit, QSlider, QComboBox, QCheckBox, QMessageBox
@@ -18,6 +33,31 @@ from revui.views.export_dialog import ExportDialog
 from revui.services.export_service import ExportService
 
 
+@lru_cache(maxsize=8)
+def _load_cfg(path: str, mtime_ns: int) -> dict:
+    """按 (路径, mtime) 记忆化的配置解析。
+
+    面板随抽屉/标签页重建时不再重复解析同一份 YAML；
+    文件一旦修改 mtime 变化，自动走新的缓存键。
+    """
+    # 直接传文件对象，省掉 read_text 的整串中间拷贝
+    with open(path, "rb") as f:
+        return yaml.load(f, Loader=_YamlLoader)
+
+
+class _ThumbTask(QRunnable):
+    """线程池里解码缩略图（QImage 可跨线程，QPixmap 不行）。"""
+
+    def __init__(self, path: str, gen: int, emit_loaded):
+        super().__init__()
+        self._path = path
+        self._gen = gen
+        self._emit_loaded = emit_loaded   # Signal(str, int, QImage).emit
+
+    def run(self):
+        self._emit_loaded(self._path, self._gen, QImage(self._path))
+
+
 class ThumbListView(QListView):
     requestContextFor = Signal(str)  # patch_id
 
@@ -39,6 +79,27 @@ class ThumbListView(QListView):
         self.requestContextFor.emit(pid)
 
 
+def _row_passes(patch_id: str, tile_id: str, score: float, reviewed: bool,
+                query: str, min_score: float,
+                only_unreviewed: bool, only_high: bool, only_low: bool) -> bool:
+    """过滤热路径：只做标量比较，不碰 Qt 对象。
+
+    独立成纯函数是为了把逐行判断与取数解耦——需要时可以整体换成
+    编译实现（Cython 等）而不动 FilterProxy。
+    """
+    if min_score > 0 and score < min_score:
+        return False
+    if only_unreviewed and reviewed:
+        return False
+    if only_high and score < 0.8:
+        return False
+    if only_low and score > 0.3:
+        return False
+    if query and query not in patch_id and query not in tile_id:
+        return False
+    return True
+
+
 class FilterProxy(QSortFilterProxyModel):
     """文本（patch_id/tile_id）+ score阈值 + 未复核/高/低置信过滤"""
     def __init__(self, manager: ReviewManager, parent=None):
@@ -49,48 +110,66 @@ class FilterProxy(QSortFilterProxyModel):
         self.only_unreviewed = False
         self.only_high = False
         self.only_low = False
+        self._active = False   # 是否有任一过滤条件生效
+        # 拒绝缓存：查询单调收窄（纯追加字符）期间，之前被拒的行必然仍被拒，
+        # 直接命中集合返回，不再重算字符串/阈值比较
+        self._rejected_ids: set = set()
 
+    # setter 只改字段；统一由 apply() 触发一次 invalidateFilter，
+    # 避免一次用户操作引起 3 次全量过滤
     def set_query(self, q: str):
-        self.query = q.strip().lower()
-        self.invalidateFilter()
+        q = q.strip().lower()
+        if not q.startswith(self.query):
+            self._rejected_ids.clear()   # 删字符/换词：收窄前提不成立
+        self.query = q
+        self._update_active()
 
     def set_min_score(self, s: float):
         self.min_score = s
-        self.invalidateFilter()
+        self._rejected_ids.clear()
+        self._update_active()
 
     def set_flags(self, unreviewed: bool, high: bool, low: bool):
         self.only_unreviewed, self.only_high, self.only_low = unreviewed, high, low
+        self._rejected_ids.clear()
+        self._update_active()
+
+    def reset_reject_cache(self):
+        """模型重建/复核状态变化后调用：缓存的拒绝结论可能失效。"""
+        self._rejected_ids.clear()
+
+    def apply(self):
         self.invalidateFilter()
 
+    def _update_active(self):
+        self._active = bool(self.query) or self.min_score > 0 \
+            or self.only_unreviewed or self.only_high or self.only_low
+
     def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        # 默认态（无查询、无阈值、无勾选）直接放行，省掉逐行取数据
+        if not self._active:
+            return True
+        # 直接 model.data(idx, role) 取角色数据，
+        # 不走 itemFromIndex 的 QStandardItem 指针表查找
         m = self.sourceModel()
         idx = m.index(source_row, 0, source_parent)
-        it: QStandardItem = m.itemFromIndex(idx)  # type: ignore
-        if it is None:
-            return False
-        pid = it.data(Qt.UserRole + 1)
+        pid = m.data(idx, Qt.UserRole + 1)
         if not pid:
             return False
-
-        score = it.data(Qt.UserRole + 2) or 0.0
-        tile_id = (it.data(Qt.UserRole + 3) or "").lower()
-        patch_id = str(pid).lower()
-
-        if self.min_score > 0 and score < self.min_score:
+        if pid in self._rejected_ids:
             return False
 
-        if self.only_unreviewed or self.only_high or self.only_low:
-            p = self.manager.get_patch_by_id(pid)
-            if not p:
-                return False
-            if self.only_unreviewed and self.manager.is_reviewed(p):
-                return False
-            if self.only_high and p.score < 0.8:
-                return False
-            if self.only_low and p.score > 0.3:
-                return False
-
-        if self.query and (self.query not in patch_id and self.query not in tile_id):
+        score = m.data(idx, Qt.UserRole + 2) or 0.0
+        # 建项时已存好小写串（UserRole+4/+5），过滤时不再逐行 lower()
+        patch_id = m.data(idx, Qt.UserRole + 4) or str(pid).lower()
+        tile_id = m.data(idx, Qt.UserRole + 5) or ""
+        # 建项时已缓存 is_reviewed（UserRole+7）；只在用得上时取
+        reviewed = bool(m.data(idx, Qt.UserRole + 7)) if self.only_unreviewed else False
+
+        if not _row_passes(patch_id, tile_id, score, reviewed,
+                           self.query, self.min_score,
+                           self.only_unreviewed, self.only_high, self.only_low):
+            self._rejected_ids.add(pid)
             return False
         return True
 
@@ -99,12 +178,16 @@ class AtypicalWidget(QWidget):
     """复核面板（供右侧/抽屉使用）：无“QC/上一/下一/选择WSI”，只负责展示/筛选/改类/导出。"""
     requestOpenInWSI = Signal(str, int, int, int, int)  # patch_id, x,y,w,h
     visiblePatchesChanged = Signal()  # 通知主窗口刷新胶片带
+    _thumbLoaded = Signal(str, int, QImage)  # 线程池解码完成：path, 代数, 图像
 
     def __init__(self, cfg_path: str | Path, parent=None):
         super().__init__(parent)
         self.cfg_path = Path(cfg_path)
-        self.cfg = yaml.safe_load(self.cfg_path.read_text(encoding="utf-8"))
-        self.labels = self.cfg.get("labels", ["ASCUS", "LSIL", "HSIL+", "Normal"])
+        self.cfg = _load_cfg(str(self.cfg_path), self.cfg_path.stat().st_mtime_ns)
+        # 标签集固定且很小：intern 后桶分发用 {label: 下标} 一次查到整数
+        self.labels = [sys.intern(str(lb))
+                       for lb in self.cfg.get("labels", ["ASCUS", "LSIL", "HSIL+", "Normal"])]
+        self._label_idx = {lb: i for i, lb in enumerate(self.labels)}
         self.palette = self.cfg.get("palette", {})
         thumb_size = self.cfg.get("thumbnail", {}).get("size", 144)
 
@@ -118,6 +201,18 @@ class AtypicalWidget(QWidget):
         self._res_dir: Path | None = None
         self._tif_path: Path | None = None
 
+        # 异步缩略图：待回填的 {path: [QStandardItem]}，代数用于丢弃过期结果
+        self._pending_thumbs: dict[str, list[QStandardItem]] = {}
+        self._thumb_gen = 0
+        self._thumbLoaded.connect(self._on_thumb_loaded)
+
+        # 跨 refresh 的图标缓存（LRU 封顶）：relabel 等触发的重建不再碰磁盘。
+        # QPixmapCache 默认上限对 144px 缩略图太小，适当调大（单位 KB）。
+        # 上限是进程全局的，只抬不降，免得压低 WSI 瓦片那边设的值
+        self._icon_cache: OrderedDict[str, QIcon] = OrderedDict()
+        self._icon_cache_cap = 4096
+        QPixmapCache.setCacheLimit(max(QPixmapCache.cacheLimit(), 64 * 1024))
+
         # UI
         root = QVBoxLayout(self)
         root.setContentsMargins(4, 4, 4, 4)
@@ -230,12 +325,33 @@ class AtypicalWidget(QWidget):
             self.addAction(action)
 
         # 过滤刷新 + 胶片带刷新
-        self.searchBox.textChanged.connect(self._on_filter_changed_emit)
-        self.scoreMin.valueChanged.connect(self._on_filter_changed_emit)
+        # 搜索框/滑条是高频事件（逐字符、拖动逐格触发），用单发定时器
+        # 合并成停顿后的一次过滤，避免每个键击都全量扫描各 tab
+        self._filter_debounce = QTimer(self)
+        self._filter_debounce.setSingleShot(True)
+        self._filter_debounce.setInterval(150)
+        self._filter_debounce.timeout.connect(self._on_filter_changed_emit)
+        self.searchBox.textChanged.connect(lambda *_: self._filter_debounce.start())
+        self.scoreMin.valueChanged.connect(lambda *_: self._filter_debounce.start())
         self.chkUnreviewed.toggled.connect(self._on_filter_changed_emit)
         self.chkHigh.toggled.connect(self._on_filter_changed_emit)
         self.chkLow.toggled.connect(self._on_filter_changed_emit)
         self.cmbSort.currentIndexChanged.connect(self._apply_sort_emit)
+        # 隐藏 tab 的过滤是惰性的：切换到脏 tab 时才补一次 invalidate
+        self._dirty_proxies: set = set()
+        self.tabs.currentChanged.connect(self._on_tab_changed)
+
+        # tab 标题计数跟随代理行数（过滤后数字才准确），0ms 单发定时器
+        # 把一串 rowsInserted/rowsRemoved 合并成一次 setTabText
+        self._tab_count_dirty: set = set()
+        self._tab_count_timer = QTimer(self)
+        self._tab_count_timer.setSingleShot(True)
+        self._tab_count_timer.setInterval(0)
+        self._tab_count_timer.timeout.connect(self._flush_tab_counts)
+        for lb, proxy in self.proxies.items():
+            for sig in (proxy.rowsInserted, proxy.rowsRemoved,
+                        proxy.layoutChanged, proxy.modelReset):
+                sig.connect(lambda *_, lb=lb: self._queue_tab_count(lb))
 
         # 默认样式
         self.setStyleSheet("""
@@ -261,6 +377,8 @@ class AtypicalWidget(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "读取失败", f"读取结果出错：\n{e}")
             return
+        if self._res_dir != Path(res_dir):
+            self._icon_cache.clear()   # 换片后旧缩略图不会再命中
         self._res_dir = Path(res_dir)
         self._tif_path = Path(p)
         self.manager.set_data(patches, meta)
@@ -285,25 +403,105 @@ class AtypicalWidget(QWidget):
 
     # ---------- 列表刷新 ----------
     def refresh_views(self):
+        # 作废上一代还没回填的缩略图结果
+        self._thumb_gen += 1
+        self._pending_thumbs.clear()
+        self._dirty_proxies.clear()   # 下面会对所有代理各 invalidate 一次
+
         patches, meta, _ = self.manager.get_state()
-        per_label = {lb: [] for lb in self.labels}
+        # 桶按下标取（标签已 intern，_label_idx 一次查出整数），
+        # 未知标签仍归入第一类
+        buckets: list[list] = [[] for _ in self.labels]
+        label_idx = self._label_idx
         for p in patches:
-            per_label.get(p.label, per_label[self.labels[0]]).append(p)
+            buckets[label_idx.get(p.label, 0)].append(p)
 
-        for i, lb in enumerate(self.labels):
+        for lb, bucket in zip(self.labels, buckets):
             base = self.models[lb]
+            lv = self.views[lb]
+            proxy = self.proxies[lb]
+
+            # 批量重建：挂起视图刷新 / 动态过滤 / 模型信号，
+            # 整批 appendRows 只触发一次布局，而不是每行一次
+            lv.setUpdatesEnabled(False)
+            proxy.setDynamicSortFilter(False)
+            base.blockSignals(True)
             base.clear()
-            for p in per_label[lb]:
+
+            items = []
+            for row_i, p in enumerate(bucket):
                 it = QStandardItem()
                 it.setData(p.patch_id, Qt.UserRole + 1)
                 it.setData(p.score, Qt.UserRole + 2)
                 it.setData(p.tile_id, Qt.UserRole + 3)
-                pix = QPixmap(str(p.thumb_path)) if p.thumb_path and Path(p.thumb_path).exists() else QPixmap()
-                if not pix.isNull():
-                    it.setIcon(QIcon(pix))
+                it.setData(p.patch_id.lower(), Qt.UserRole + 4)       # 过滤用小写
+                it.setData(str(p.tile_id).lower(), Qt.UserRole + 5)
+                it.setData(p, Qt.UserRole + 6)                        # Patch 引用
+                it.setData(self.manager.is_reviewed(p), Qt.UserRole + 7)
+                # 缩略图不在 GUI 线程同步解码：命中 QPixmapCache 直接用，
+                # 否则丢给线程池，解码完成后回填 icon
+                # 存在性是载入时批量判好的（thumb_exists），这里不 stat；
+                # 确定缺失的缩略图也不浪费线程池去解码
+                thumb_key = str(p.thumb_path) if (p.thumb_path and p.thumb_exists) else ""
+                it.setData(thumb_key, Qt.UserRole + 8)
+                it.setData(row_i, Qt.UserRole + 9)                    # 插入序，“默认”排序用
+                if thumb_key:
+                    icon = self._cached_icon(thumb_key)
+                    if icon is not None:
+                        it.setIcon(icon)
+                    else:
+                        waiting = self._pending_thumbs.get(thumb_key)
+                        if waiting is None:
+                            self._pending_thumbs[thumb_key] = waiting = []
+                            QThreadPool.globalInstance().start(
+                                _ThumbTask(thumb_key, self._thumb_gen, self._thumbLoaded.emit)
+                            )
+                        waiting.append(it)
                 it.setText(f"{p.patch_id}\nscore={p.score:.3f}")
-                base.appendRow(it)
-            self.tabs.setTabText(i, f"{lb} ({len(per_label[lb])})")
+                items.append(it)
+            if items:
+                base.invisibleRootItem().appendRows(items)
+
+            base.blockSignals(False)
+            proxy.setDynamicSortFilter(True)
+            proxy.reset_reject_cache()   # 重建后复核状态可能已变
+            proxy.invalidate()
+            lv.setUpdatesEnabled(True)
+            self._queue_tab_count(lb)   # 断开的代理不发信号，这里统一入队
+        self._apply_sort()   # 重建后 base 顺序回到插入序，按当前模式重排
+
+    def _on_thumb_loaded(self, path: str, gen: int, img: QImage):
+        """GUI 线程回调：把线程池解码好的缩略图回填到等待的项上。"""
+        if gen != self._thumb_gen:
+            return
+        waiting = self._pending_thumbs.pop(path, None)
+        if not waiting or img.isNull():
+            return
+        pix = QPixmap.fromImage(img)
+        QPixmapCache.insert(path, pix)
+        icon = QIcon(pix)
+        self._store_icon(path, icon)
+        for it in waiting:
+            it.setIcon(icon)
+
+    def _cached_icon(self, key: str) -> QIcon | None:
+        icon = self._icon_cache.get(key)
+        if icon is not None:
+            self._icon_cache.move_to_end(key)
+            return icon
+        # 图标缓存被挤掉但像素还在 QPixmapCache 时重新包一层
+        pix = QPixmap()
+        if QPixmapCache.find(key, pix):
+            icon = QIcon(pix)
+            self._store_icon(key, icon)
+            return icon
+        return None
+
+    def _store_icon(self, key: str, icon: QIcon):
+        self._icon_cache[key] = icon
+        self._icon_cache.move_to_end(key)
+        while len(self._icon_cache) > self._icon_cache_cap:
+            self._icon_cache.popitem(last=False)
 
     # ---------- 筛选/排序 ----------
     def _on_filter_changed_emit(self, *_args):
@@ -321,20 +519,86 @@ class AtypicalWidget(QWidget):
         only_high = self.chkHigh.isChecked()
         only_low = self.chkLow.isChecked()
 
+        current = self.labels[self.tabs.currentIndex()] \
+            if 0 <= self.tabs.currentIndex() < len(self.labels) else None
         for lb, proxy in self.proxies.items():
             proxy.set_query(q)
             proxy.set_min_score(min_score)
             proxy.set_flags(only_unrev, only_high, only_low)
+            # 只对可见 tab 立即重过滤，其余标脏、切换过去时再补——
+            # 每次改条件的过滤量从 4 个模型降到 1 个
+            if lb == current:
+                proxy.apply()
+                self._dirty_proxies.discard(lb)
+            else:
+                self._dirty_proxies.add(lb)
+
+    def _on_tab_changed(self, index: int):
+        if not (0 <= index < len(self.labels)):
+            return
+        lb = self.labels[index]
+        proxy = self.proxies[lb]
+        # 只让可见 tab 的代理挂在源模型上：断开的代理不再跟着 base 的
+        # 每次变更做 QSFPM 增量维护
+        for other_lb, other in self.proxies.items():
+            if other_lb != lb and other.sourceModel() is not None:
+                other.setSourceModel(None)
+        if proxy.sourceModel() is None:
+            # 重挂即全量重建映射，顺带覆盖了“脏了再补”的 invalidate
+            proxy.setSourceModel(self.models[lb])
+            self._dirty_proxies.discard(lb)
+        elif lb in self._dirty_proxies:
+            self._dirty_proxies.discard(lb)
+            proxy.apply()
+
+    def _queue_tab_count(self, lb: str):
+        self._tab_count_dirty.add(lb)
+        self._tab_count_timer.start()
+
+    def _flush_tab_counts(self):
+        for lb in self._tab_count_dirty:
+            i = self.labels.index(lb)
+            proxy = self.proxies[lb]
+            # 挂着源模型时显示过滤后的行数；断开（后台 tab）退回全量数
+            n = proxy.rowCount() if proxy.sourceModel() is not None \
+                else self.models[lb].rowCount()
+            self.tabs.setTabText(i, f"{lb} ({n})")
+        self._tab_count_dirty.clear()
+
+    # 抽屉收起时整个面板不可见，四个代理都断开源模型；
+    # 再展开时只重挂当前 tab 的
+    def hideEvent(self, e):
+        super().hideEvent(e)
+        for proxy in self.proxies.values():
+            proxy.setSourceModel(None)
+
+    def showEvent(self, e):
+        super().showEvent(e)
+        idx = self.tabs.currentIndex()
+        if 0 <= idx < len(self.labels):
+            lb = self.labels[idx]
+            proxy = self.proxies[lb]
+            if proxy.sourceModel() is None:
+                proxy.setSourceModel(self.models[lb])
+                self._dirty_proxies.discard(lb)
 
     def _apply_sort(self):
+        # 排序在 base 模型上原生做（C++ 侧按角色比较），代理只负责过滤：
+        # QSFPM 的 lessThan 每次比较都要跨 Python 绑定取两次 data()，
+        # QStandardItemModel.sort 则一次排完
         mode = self.cmbSort.currentText()
-        for proxy in self.proxies.values():
-            if mode == "默认":
-                proxy.sort(-1)
-            elif mode == "score↑":
-                proxy.sort(0, Qt.AscendingOrder)
+        for lb, proxy in self.proxies.items():
+            proxy.sort(-1)
+            base = self.models[lb]
+            if mode == "score↑":
+                base.setSortRole(Qt.UserRole + 2)
+                base.sort(0, Qt.AscendingOrder)
             elif mode == "score↓":
-                proxy.sort(0, Qt.DescendingOrder)
+                base.setSortRole(Qt.UserRole + 2)
+                base.sort(0, Qt.DescendingOrder)
+            else:   # “默认”=插入序
+                base.setSortRole(Qt.UserRole + 9)
+                base.sort(0, Qt.AscendingOrder)
 
     # ---------- 右键菜单 & 打开细节 ----------
     def _ctx_menu_for(self, patch_id: str):
@@ -346,14 +610,10 @@ class AtypicalWidget(QWidget):
 
     def _open_detail_from_index(self, label: str):
         def handler(idx: QModelIndex):
-            proxy = self.proxies[label]
-            base = self.models[label]
-            src_idx = proxy.mapToSource(idx)
-            it = base.itemFromIndex(src_idx)
-            if not it:
-                return
-            pid = it.data(Qt.UserRole + 1)
-            p = self.manager.get_patch_by_id(pid)
+            # 坐标直接取建项时存的 Patch 引用（UserRole+6）：
+            # 不走 itemFromIndex，也不回 manager 查一次
+            src_idx = self.proxies[label].mapToSource(idx)
+            p: Patch | None = src_idx.data(Qt.UserRole + 6)
             if not p:
                 return
             self.requestOpenInWSI.emit(p.patch_id, p.x, p.y, p.w, p.h)
@@ -370,8 +630,7 @@ class AtypicalWidget(QWidget):
                 src_idx = proxy.mapToSource(idx)
                 it = base.itemFromIndex(src_idx)
                 ids.append(it.data(Qt.UserRole + 1))
-        for pid in ids:
-            self.manager.move_class(pid, target_label)
+        self.manager.bulk_move_class(ids, target_label)
         self.refresh_views()
         self.visiblePatchesChanged.emit()
 
@@ -1,16 +1,81 @@
 # InfoWidget.py —— 抽屉覆盖 + 遮罩 + 自适应宽度 + 可折叠组医生标注表单
 from __future__ import annotations
 
+from enum import IntEnum
+
 from PySide6.QtCore import *
 from PySide6.QtGui import *
 from PySide6.QtWidgets import *
 
+# ---------- 选项表 / 样式表常量 ----------
+# 模块级只建一次；QSS 字符串复用同一对象，
+# 多次实例化表单时 Qt 的样式缓存可按同串命中
+_INFECTION_OPTIONS = ("放线菌", "菌群转变", "滴虫感染", "霉菌感染", "HPV感染", "疱疹病毒感染")
+_SQUAMOUS_OPTIONS = (
+    "意义不明确(ASC-US)", "不除外高级别鳞状上皮内病变(ASC-H)",
+    "低级别鳞状上皮内病变(LSIL)", "高级别鳞状上皮内病变(HSIL)", "鳞状细胞癌"
+)
+_GLAND_OPTIONS = (
+    "子宫颈管腺细胞", "子宫内膜腺细胞", "腺细胞",
+    "子宫颈管腺细胞，倾向于肿瘤性", "腺细胞，倾向于肿瘤性",
+    "子宫颈管腺癌", "子宫内膜腺癌", "子宫外腺癌", "未指明类型腺癌"
+)
+_INFLAMMATION_OPTIONS = ("无", "轻度", "中度", "重度", "其他")
+_DIAGNOSIS_OPTIONS = ("未见上皮内病变或恶性细胞 (NILM)", "ASC-US", "LSIL", "HSIL", "鳞癌", "其他")
+_SUGGESTION_OPTIONS = ("请选择", "建议 HPV 检测", "建议 6 个月复查", "建议阴道镜活检", "其他")
+
+_DRAWER_QSS = """
+    #RightDrawer {
+        background: #F5FAFF;
+        border-left: 1px solid #cfd8dc;
+    }
+"""
+_TAB_QSS = """
+    QTabWidget::pane { border-top: 2px solid #1976d2; background-color: #f5faff; }
+    QTabBar::tab {
+        background-color: #bbdefb; color: #37474f;
+        border: 1px solid #64b5f6; border-bottom: none;
+        padding: 6px 14px; font-size: 13px; min-width: 110px;
+    }
+    QTabBar::tab:selected { background-color: #1976d2; color: white; font-weight: bold; }
+    QTabBar::tab:!selected:hover { background-color: #90caf9; color: #1e88e5; }
+"""
+_EDGE_BTN_QSS = """
+    QToolButton {
+        background: #e3f2fd;
+        border: 1px solid #90caf9;
+        border-right: none;
+        font-weight: bold;
+        color: #1565c0;
+        border-top-left-radius: 8px;
+        border-bottom-left-radius: 8px;
+    }
+    QToolButton:hover { background: #bbdefb; }
+"""
+_CAPTURE_BTN_QSS = "border:2px dashed gray; background:#FAFAFA;"
+_FORM_QSS = """
+    QGroupBox {
+        font-size: 14px; font-weight: bold; color: #0D47A1;
+        border: 2px solid #64B5F6; border-radius: 8px;
+        margin-top: 14px; background-color: #F5FAFF;
+    }
+    QGroupBox::title {
+        subcontrol-origin: margin; subcontrol-position: top center;
+        padding: 4px 12px;
+    }
+"""
+
 
 # ---------- 可折叠组 ----------
 class CollapsibleGroupBox(QGroupBox):
     toggled_by_user = Signal(bool)
 
-    def __init__(self, title: str, parent=None, start_expanded=True):
+    def __init__(self, title: str, parent=None, start_expanded=True, builder=None):
+        """builder: 可选的内容构造回调（返回 QLayout）。
+
+        折叠启动的组传 builder 可以把控件构建推迟到首次展开，
+        初始窗口少建一批 QWidget。
+        """
         super().__init__(title, parent)
         self.setCheckable(True)
         self.setChecked(start_expanded)
@@ -23,46 +88,89 @@ class CollapsibleGroupBox(QGroupBox):
         self.content_layout = QVBoxLayout(self._content)
         self.content_layout.setContentsMargins(0, 0, 0, 0)
 
+        self._builder = builder
+        if builder is not None and start_expanded:
+            self.setContentLayout(builder())
+            self._builder = None
+
         self.toggled.connect(self._on_toggled)
 
     def setContentLayout(self, layout: QLayout):
-        # 清空旧 layout
-        while True:
-            item = self.content_layout.takeAt(0)
-            if not item:
-                break
-            w = item.widget()
-            if w:
-                w.setParent(None)
+        # 首次设置（空内容）直接挂上；替换时把旧 _content 连同子树整个
+        # 交给 deleteLater 在 C++ 侧拆，不在 Python 里逐项 takeAt/setParent
+        if self.content_layout.count() == 0:
+            self.content_layout.addLayout(layout)
+            return
+        self._content.deleteLater()
+        self._content = QWidget(self)
+        self.layout().insertWidget(0, self._content)
+        self.content_layout = QVBoxLayout(self._content)
+        self.content_layout.setContentsMargins(0, 0, 0, 0)
         self.content_layout.addLayout(layout)
+        self._content.setVisible(self.isChecked())
 
+    # @Slot：注册成真正的元对象槽，连接/派发走 C++ 路径，
+    # 不再每次连接往 QMetaObject 追加动态槽
+    @Slot(bool)
     def _on_toggled(self, checked: bool):
+        if checked and self._builder is not None:
+            self.setContentLayout(self._builder())   # 首次展开才真正建内容
+            self._builder = None
         self._content.setVisible(checked)
         self.toggled_by_user.emit(checked)
 
 
+_title_font: QFont | None = None
+
+
+def _get_title_font() -> QFont:
+    """抽屉标题字体：QFont 要等 QApplication 起来才能建，惰性初始化后全局复用，
+    重复建抽屉不再每次走字体库查询。"""
+    global _title_font
+    if _title_font is None:
+        f = QFont()
+        f.setPointSize(14)
+        f.setBold(True)
+        _title_font = f
+    return _title_font
+
+
+# ---------- 抽屉状态机 ----------
+class DrawerState(IntEnum):
+    """单一状态取代 _opened/_animating 双布尔：
+    非法组合（如开着又在关）直接表达不出来。"""
+    Closed = 0
+    Opening = 1
+    Open = 2
+    Closing = 3
+
+
 # ---------- 右侧抽屉：自适应宽度 + 几何动画 ----------
 class RightDrawer(QWidget):
     def __init__(self, parent=None, base_width=380, anim_ms=220,
                  min_width=360, max_ratio=0.7, padding=32):
         super().__init__(parent)
         self.setObjectName("RightDrawer")
-        self._opened = False
-        self._animating = False
+        self._state = DrawerState.Closed
+        # 本架构下抽屉终生挂在同一宿主上：缓存引用，
+        # 动画每帧/每次 resize 不再走 parentWidget() 的查找+转型
+        self._parent = parent
 
         self._min_width = min_width
         self._max_ratio = max_ratio
         self._extra_padding = padding
         self._fallback_width = base_width
         self._anim_ms = anim_ms
+        # 宽度测量缓存：同一父宽下 relayout/open/_syncLayers 反复调用
+        # 不必每次都 adjustSize + 递归 sizeHint
+        self._cached_width = -1
+        self._cached_parent_w = -1
 
         self.setAttribute(Qt.WA_StyledBackground, True)
-        self.setStyleSheet("""
-            #RightDrawer {
-                background: #F5FAFF;
-                border-left: 1px solid #cfd8dc;
-            }
-        """)
+        # 背景完全不透明：声明后 Qt 动画期间不再重绘抽屉底下的父区域
+        self.setAttribute(Qt.WA_OpaquePaintEvent, True)
+        self.setAutoFillBackground(True)
+        self.setStyleSheet(_DRAWER_QSS)
 
         # 内容框架
         self.vbox = QVBoxLayout(self)
@@ -71,10 +179,7 @@ class RightDrawer(QWidget):
 
         title_bar = QHBoxLayout()
         self.lbl_title = QLabel("右侧面板")
-        f = self.lbl_title.font()
-        f.setPointSize(14)
-        f.setBold(True)
-        self.lbl_title.setFont(f)
+        self.lbl_title.setFont(_get_title_font())
         self.lbl_title.setWordWrap(True)
         title_bar.addWidget(self.lbl_title)
         title_bar.addStretch(1)
@@ -99,84 +204,129 @@ class RightDrawer(QWidget):
         self.scroll_layout.setSpacing(10)
         self.vbox.addWidget(self.scroll_area, 1)
 
-        # 几何动画
-        self.anim = QPropertyAnimation(self, b"geometry", self)
+        # 开合动画只动 x：宽高在动画前一次定好，每帧 move() 不会
+        # 像动 geometry 那样逐帧触发滚动区整棵控件树的 relayout
+        self.anim = QVariantAnimation(self)
         self.anim.setEasingCurve(QEasingCurve.OutCubic)
         self.anim.setDuration(anim_ms)
+        self.anim.valueChanged.connect(self._on_anim_value)
         self.anim.finished.connect(self._on_anim_finished)
 
+    @property
+    def state(self) -> DrawerState:
+        return self._state
+
     @property
     def is_open(self):
-        return self._opened
+        return self._state in (DrawerState.Opening, DrawerState.Open)
 
     def _compute_required_width(self) -> int:
+        parent = self._parent
+        pw = parent.width() if parent else -1
+        if self._cached_width != -1 and pw == self._cached_parent_w:
+            return self._cached_width
         self.scroll_content.adjustSize()
         need = self.scroll_content.sizeHint().width() + self._extra_padding
         if need <= 0:
             need = self._fallback_width
-        parent = self.parentWidget()
         if parent:
-            cap = int(parent.width() * self._max_ratio)
+            cap = int(pw * self._max_ratio)
             need = min(need, cap)
-        return max(self._min_width, need)
+        need = max(self._min_width, need)
+        self._cached_width = need
+        self._cached_parent_w = pw
+        return need
 
-    def _target_rect(self, opening: bool) -> tuple[QRect, QRect]:
-        p = self.parentWidget()
-        if not p:
-            return QRect(), QRect()
-        h = p.height()
-        w = self._compute_required_width()
-        if opening:
-            rect_from = QRect(p.width(), 0, w, h)
-            rect_to   = QRect(p.width() - w, 0, w, h)
-        else:
-            rect_from = QRect(p.width() - w, 0, w, h)
-            rect_to   = QRect(p.width(), 0, w, h)
-        return rect_from, rect_to
+    def invalidate_width_cache(self):
+        """滚动区内容变化（可能改变 sizeHint）后调用，下次重新测量。"""
+        self._cached_width = -1
 
     def open(self):
-        if self._opened or self._animating:
+        if self._state != DrawerState.Closed:
             return
-        self._opened = True
-        self._animating = True
+        p = self._parent
+        if not p:
+            return
+        self._state = DrawerState.Opening
+        w = self._compute_required_width()
+        self.resize(w, p.height())          # 尺寸动画前定死，之后只平移
+        self.move(p.width(), 0)
         self.show()
         self.raise_()
-        rect_from, rect_to = self._target_rect(True)
+        # 动画期间表单内容静止，挂起视口重绘，收尾再补一次
+        self.scroll_area.viewport().setUpdatesEnabled(False)
         self.anim.stop()
-        self.anim.setStartValue(rect_from)
-        self.anim.setEndValue(rect_to)
+        self.anim.setStartValue(p.width())
+        self.anim.setEndValue(p.width() - w)
         self.anim.start()
 
     def close_drawer(self):
-        if not self._opened or self._animating:
+        if self._state != DrawerState.Open:
             return
-        self._opened = False
-        self._animating = True
-        rect_from, rect_to = self._target_rect(False)
+        p = self._parent
+        if not p:
+            return
+        self._state = DrawerState.Closing
+        self.scroll_area.viewport().setUpdatesEnabled(False)
         self.anim.stop()
-        self.anim.setStartValue(rect_from)
-        self.anim.setEndValue(rect_to)
+        self.anim.setStartValue(self.x())
+        self.anim.setEndValue(p.width())
         self.anim.start()
 
+    @Slot(int)
+    def _on_anim_value(self, x):
+        self.move(int(x), 0)
+
+    @Slot()
     def _on_anim_finished(self):
-        self._animating = False
-        if not self._opened:
+        self._state = DrawerState.Open if self._state == DrawerState.Opening \
+            else DrawerState.Closed
+        vp = self.scroll_area.viewport()
+        if not vp.updatesEnabled():
+            vp.setUpdatesEnabled(True)
+            vp.update()
+        if self._state == DrawerState.Closed:
             self.hide()
-        p = self.parentWidget()
+        # 动画收尾统一在这里同步叠层，宿主不再另排补偿定时器
+        p = self._parent
         if p and hasattr(p, "_syncLayers"):
-            QTimer.singleShot(0, p._syncLayers)
+            p._syncLayers()
 
     def relayout(self):
-        p = self.parentWidget()
+        p = self._parent
         if not p:
             return
+        if self._state != DrawerState.Open:
+            # 常态是关着的：不必跟着每次窗口缩放去量宽、挪一个
+            # 藏在屏幕外的控件，open() 自己会重新测量定位
+            return
         w = self._compute_required_width()
-        if self._opened:
-            self.setGeometry(QRect(p.width() - w, 0, w, p.height()))
-            self.show()
-            self.raise_()
-        else:
-            self.setGeometry(QRect(p.width(), 0, w, p.height()))
+        self.setGeometry(QRect(p.width() - w, 0, w, p.height()))
+        self.show()
+        self.raise_()
+
+
+# ---------- 半透明遮罩 ----------
+class _DimMask(QPushButton):
+    """rgba 底色只在尺寸变化时混合进缓存 pixmap 一次，
+    paintEvent 整块 drawPixmap——不像样式表那样每次损伤都重新混合。
+
+    做成按钮是为了“点遮罩关抽屉”走 clicked 信号的 C++ 派发，
+    省掉对遮罩上每个事件都进一次 Python 的 eventFilter。"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFlat(True)
+        self.setCursor(Qt.PointingHandCursor)
+        self._pix = QPixmap()
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        if self._pix.size() != self.size():
+            self._pix = QPixmap(self.size())
+            self._pix.fill(QColor(0, 0, 0, 80))
+
+    def paintEvent(self, e):
+        QPainter(self).drawPixmap(0, 0, self._pix)
 
 
 # ---------- 覆盖容器：中间主区域 + 遮罩 + 抽屉 ----------
@@ -190,24 +340,13 @@ class OverlayHost(QWidget):
         self.tab.setDocumentMode(True)
         self.tab.setTabsClosable(False)
         self.tab.setMovable(False)
-        self.tab.setStyleSheet("""
-            QTabWidget::pane { border-top: 2px solid #1976d2; background-color: #f5faff; }
-            QTabBar::tab {
-                background-color: #bbdefb; color: #37474f;
-                border: 1px solid #64b5f6; border-bottom: none;
-                padding: 6px 14px; font-size: 13px; min-width: 110px;
-            }
-            QTabBar::tab:selected { background-color: #1976d2; color: white; font-weight: bold; }
-            QTabBar::tab:!selected:hover { background-color: #90caf9; color: #1e88e5; }
-        """)
-
-        # 遮罩
-        self.mask = QWidget(self)
+        self.tab.setStyleSheet(_TAB_QSS)
+
+        # 遮罩（点按关闭抽屉）
+        self.mask = _DimMask(self)
         self.mask.setObjectName("OverlayMask")
-        self.mask.setAttribute(Qt.WA_StyledBackground, True)
-        self.mask.setStyleSheet("#OverlayMask { background: rgba(0, 0, 0, 80); }")
         self.mask.hide()
-        self.mask.installEventFilter(self)
+        self.mask.clicked.connect(self.closeDrawer)
 
         # 抽屉
         self.drawer = RightDrawer(self, base_width=drawer_base_width, anim_ms=anim_ms)
@@ -218,18 +357,7 @@ class OverlayHost(QWidget):
         self.edgeBtn.setCursor(Qt.PointingHandCursor)
         self.edgeBtn.setAutoRaise(True)
         self.edgeBtn.setFixedSize(64, 96)
-        self.edgeBtn.setStyleSheet("""
-            QToolButton {
-                background: #e3f2fd;
-                border: 1px solid #90caf9;
-                border-right: none;
-                font-weight: bold;
-                color: #1565c0;
-                border-top-left-radius: 8px;
-                border-bottom-left-radius: 8px;
-            }
-            QToolButton:hover { background: #bbdefb; }
-        """)
+        self.edgeBtn.setStyleSheet(_EDGE_BTN_QSS)
 
         # 布局
         lay = QVBoxLayout(self)
@@ -242,48 +370,60 @@ class OverlayHost(QWidget):
         self.edgeBtn.clicked.connect(self.openDrawer)
         self.drawer.btn_close.clicked.connect(self.closeDrawer)
 
-        self.drawer._opened = False
+        self._last_layer_state = None   # 上次应用的叠层状态，未变则跳过
+        self._resize_pending = False    # resize 重活合并标记
         self._syncLayers()
 
     # 公共接口，方便外部调用
+    @Slot()
     def openDrawer(self):
-        if not self.drawer.is_open and not self.drawer._animating:
+        if self.drawer.state == DrawerState.Closed:
             self.mask.show()
             self.mask.raise_()
             self.drawer.open()
             self._syncLayers()
-            QTimer.singleShot(self._anim_ms + 60, self._syncLayers)
 
+    @Slot()
     def closeDrawer(self):
-        if self.drawer.is_open and not self.drawer._animating:
+        if self.drawer.state == DrawerState.Open:
             self.drawer.close_drawer()
-            QTimer.singleShot(self._anim_ms + 60, self._syncLayers)
 
+    @Slot()
     def toggleDrawer(self):
         if self.drawer.is_open:
             self.closeDrawer()
         else:
             self.openDrawer()
 
-    # 遮罩点击关闭
-    def eventFilter(self, obj, ev):
-        if obj is self.mask and ev.type() == QEvent.MouseButtonPress:
-            self.closeDrawer()
-            return True
-        return super().eventFilter(obj, ev)
-
     def resizeEvent(self, e):
         super().resizeEvent(e)
+        # 便宜的几何同步立即做，保证拖动过程中视觉正确
         self.tab.setGeometry(0, 0, self.width(), self.height())
         self.mask.setGeometry(0, 0, self.width(), self.height())
-        self.drawer.relayout()
 
         x = self.width() - self.edgeBtn.width() + 2
         y = (self.height() - self.edgeBtn.height()) // 2
         self.edgeBtn.move(x, y)
+
+        # 重活（抽屉重测宽度 + 叠层同步）合并到事件循环末尾做一次：
+        # 拖拽缩放按刷新率连发 resizeEvent，这里只排一个 0ms 单发
+        if not self._resize_pending:
+            self._resize_pending = True
+            QTimer.singleShot(0, self._flush_resize)
+
+    @Slot()
+    def _flush_resize(self):
+        self._resize_pending = False
+        self.drawer.relayout()
         self._syncLayers()
 
     def _syncLayers(self):
+        # resize / 开关动画 / 动画收尾都会打到这里；
+        # 叠层只由“抽屉开没开”决定，状态没变就不重复 show/hide/raise_
+        state = self.drawer.is_open
+        if state == self._last_layer_state:
+            return
+        self._last_layer_state = state
         if self.drawer.is_open:
             self.mask.show()
             self.mask.stackUnder(self.drawer)
@@ -306,64 +446,58 @@ class OverlayHost(QWidget):
 class InfoFormWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.selected_options_1 = {}
-        self.selected_options_2 = {}
-        self.selected_options_3 = {}
+        # 纯存在性集合：导出时直接 list(...) 即可
+        self.selected_options_1 = set()
+        self.selected_options_2 = set()
+        self.selected_options_3 = set()
         self._init_ui()
 
     def _init_ui(self):
+        # 构建期挂起重绘，结尾一次性放开
+        self.setUpdatesEnabled(False)
         layout = QVBoxLayout(self)
         layout.setContentsMargins(8, 8, 8, 8)
         layout.setSpacing(8)
 
-        def new_label(text: str) -> QLabel:
-            lbl = QLabel(text)
-            lbl.setWordWrap(True)
-            return lbl
-
-        # 样本信息
+        def new_combo(items) -> QComboBox:
+            cb = QComboBox()
+            # addItems 逐项发 currentIndexChanged / 几何重算，建箱期间屏蔽
+            cb.blockSignals(True)
+            cb.addItems(items)
+            cb.setCurrentIndex(0)
+            cb.blockSignals(False)
+            return cb
+
+        # 样本信息：QFormLayout 一个布局节点管全部行，
+        # sizeHint 树比五个嵌套 QHBoxLayout 浅得多
         sample_group = CollapsibleGroupBox("样本信息", start_expanded=True)
-        _lay_sample = QVBoxLayout()
-        row1 = QHBoxLayout()
-        row1.addWidget(new_label("样本满意度:"))
-        self.box1 = QComboBox()
-        self.box1.addItems(["满意", "不满意"])
-        row1.addWidget(self.box1)
-        _lay_sample.addLayout(row1)
-
-        row2 = QHBoxLayout()
-        row2.addWidget(new_label("总细胞数"))
-        self.box2 = QComboBox()
-        self.box2.addItems([">5000个细胞", "其他"])
-        row2.addWidget(self.box2)
-        _lay_sample.addLayout(row2)
+        _lay_sample = QFormLayout()
+        self.box1 = new_combo(["满意", "不满意"])
+        _lay_sample.addRow("样本满意度:", self.box1)
+
+        self.box2 = new_combo([">5000个细胞", "其他"])
+        _lay_sample.addRow("总细胞数", self.box2)
 
         row3 = QHBoxLayout()
-        row3.addWidget(new_label("颈管细胞:"))
         self.option1_1 = QRadioButton("有")
         self.option1_2 = QRadioButton("无")
         self.option1_1.setChecked(True)
         row3.addWidget(self.option1_1)
         row3.addWidget(self.option1_2)
         row3.addStretch(1)
-        _lay_sample.addLayout(row3)
+        _lay_sample.addRow("颈管细胞:", row3)
 
         row4 = QHBoxLayout()
-        row4.addWidget(new_label("化生细胞:"))
         self.option2_1 = QRadioButton("有")
         self.option2_2 = QRadioButton("无")
         self.option2_1.setChecked(True)
         row4.addWidget(self.option2_1)
         row4.addWidget(self.option2_2)
         row4.addStretch(1)
-        _lay_sample.addLayout(row4)
+        _lay_sample.addRow("化生细胞:", row4)
 
-        row5 = QHBoxLayout()
-        row5.addWidget(new_label("炎症程度:"))
-        self.box5 = QComboBox()
-        self.box5.addItems(["无", "轻度", "中度", "重度", "其他"])
-        row5.addWidget(self.box5)
-        _lay_sample.addLayout(row5)
+        self.box5 = new_combo(_INFLAMMATION_OPTIONS)
+        _lay_sample.addRow("炎症程度:", self.box5)
 
         sample_group.setContentLayout(_lay_sample)
         layout.addWidget(sample_group)
@@ -371,9 +505,7 @@ class InfoFormWidget(QWidget):
         # 感染情况
         infection_group = CollapsibleGroupBox("感染情况", start_expanded=True)
         _lay_inf = QVBoxLayout()
-        for option in ["放线菌", "菌群转变", "滴虫感染", "霉菌感染", "HPV感染", "疱疹病毒感染"]:
-            cb = QCheckBox(option)
-            cb.toggled.connect(lambda checked, text=option: self.on_checkbox_toggled_1(text, checked))
+        for cb in self._mk_checkboxes(_INFECTION_OPTIONS, 1):
             _lay_inf.addWidget(cb)
         infection_group.setContentLayout(_lay_inf)
         layout.addWidget(infection_group)
@@ -381,95 +513,78 @@ class InfoFormWidget(QWidget):
         # 鳞状上皮细胞
         squamous_group = CollapsibleGroupBox("鳞状细胞", start_expanded=True)
         _lay_sq = QGridLayout()
-        opts1 = [
-            "意义不明确(ASC-US)", "不除外高级别鳞状上皮内病变(ASC-H)",
-            "低级别鳞状上皮内病变(LSIL)", "高级别鳞状上皮内病变(HSIL)", "鳞状细胞癌"
-        ]
-        for i, opt in enumerate(opts1):
-            cb = QCheckBox(opt)
-            cb.toggled.connect(lambda checked, text=opt: self.on_checkbox_toggled_2(text, checked))
+        for i, cb in enumerate(self._mk_checkboxes(_SQUAMOUS_OPTIONS, 2)):
             _lay_sq.addWidget(cb, i // 2, i % 2)
         _lay_sq.setColumnStretch(0, 1)
         _lay_sq.setColumnStretch(1, 1)
         squamous_group.setContentLayout(_lay_sq)
         layout.addWidget(squamous_group)
 
-        # 腺上皮细胞
-        gland_group = CollapsibleGroupBox("腺细胞", start_expanded=False)
-        _lay_gl = QGridLayout()
-        opts2 = [
-            "子宫颈管腺细胞", "子宫内膜腺细胞", "腺细胞",
-            "子宫颈管腺细胞，倾向于肿瘤性", "腺细胞，倾向于肿瘤性",
-            "子宫颈管腺癌", "子宫内膜腺癌", "子宫外腺癌", "未指明类型腺癌"
-        ]
-        for i, opt in enumerate(opts2):
-            cb = QCheckBox(opt)
-            cb.toggled.connect(lambda checked, text=opt: self.on_checkbox_toggled_3(text, checked))
-            _lay_gl.addWidget(cb, i // 3, i % 3)
-        _lay_gl.setColumnStretch(0, 1)
-        _lay_gl.setColumnStretch(1, 1)
-        _lay_gl.setColumnStretch(2, 1)
-        gland_group.setContentLayout(_lay_gl)
+        # 腺上皮细胞（折叠启动：内容推迟到首次展开再建）
+        def _build_gland() -> QGridLayout:
+            _lay_gl = QGridLayout()
+            for i, cb in enumerate(self._mk_checkboxes(_GLAND_OPTIONS, 3)):
+                _lay_gl.addWidget(cb, i // 3, i % 3)
+            _lay_gl.setColumnStretch(0, 1)
+            _lay_gl.setColumnStretch(1, 1)
+            _lay_gl.setColumnStretch(2, 1)
+            return _lay_gl
+
+        gland_group = CollapsibleGroupBox("腺细胞", start_expanded=False,
+                                          builder=_build_gland)
         layout.addWidget(gland_group)
 
-        # 截图
-        capture_group = CollapsibleGroupBox("截图", start_expanded=False)
-        _lay_cap = QHBoxLayout()
-        _lay_cap.addWidget(QLabel("选取截图"))
-        btn_capture = QPushButton("📷 点击截取")
-        btn_capture.setFixedSize(150, 80)
-        btn_capture.setStyleSheet("border:2px dashed gray; background:#FAFAFA;")
-        _lay_cap.addWidget(btn_capture)
-        _lay_cap.addStretch(1)
-        capture_group.setContentLayout(_lay_cap)
+        # 截图（同上，惰性构建）
+        def _build_capture() -> QHBoxLayout:
+            _lay_cap = QHBoxLayout()
+            _lay_cap.addWidget(QLabel("选取截图"))
+            btn_capture = QPushButton("📷 点击截取")
+            btn_capture.setFixedSize(150, 80)
+            btn_capture.setStyleSheet(_CAPTURE_BTN_QSS)
+            _lay_cap.addWidget(btn_capture)
+            _lay_cap.addStretch(1)
+            return _lay_cap
+
+        capture_group = CollapsibleGroupBox("截图", start_expanded=False,
+                                            builder=_build_capture)
         layout.addWidget(capture_group)
 
         # 诊断与建议
         result_group = CollapsibleGroupBox("诊断与建议", start_expanded=True)
-        _lay_res = QVBoxLayout()
-        self.box_line_5 = QComboBox()
-        self.box_line_5.addItems(["未见上皮内病变或恶性细胞 (NILM)", "ASC-US", "LSIL", "HSIL", "鳞癌", "其他"])
-        _lay_res.addWidget(QLabel("诊断结果"))
-        _lay_res.addWidget(self.box_line_5)
-        self.box_line_6 = QComboBox()
-        self.box_line_6.addItems(["请选择", "建议 HPV 检测", "建议 6 个月复查", "建议阴道镜活检", "其他"])
-        _lay_res.addWidget(QLabel("附注建议"))
-        _lay_res.addWidget(self.box_line_6)
+        _lay_res = QFormLayout()
+        self.box_line_5 = new_combo(_DIAGNOSIS_OPTIONS)
+        _lay_res.addRow("诊断结果", self.box_line_5)
+        self.box_line_6 = new_combo(_SUGGESTION_OPTIONS)
+        _lay_res.addRow("附注建议", self.box_line_6)
         result_group.setContentLayout(_lay_res)
         layout.addWidget(result_group)
 
         layout.addStretch(1)
 
-        self.setStyleSheet("""
-            QGroupBox {
-                font-size: 14px; font-weight: bold; color: #0D47A1;
-                border: 2px solid #64B5F6; border-radius: 8px;
-                margin-top: 14px; background-color: #F5FAFF;
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin; subcontrol-position: top center;
-                padding: 4px 12px;
-            }
-        """)
-
-    # 选项记录（后续可以导出 JSON）
-    def on_checkbox_toggled_1(self, text, checked):
-        if checked:
-            self.selected_options_1[text] = True
-        else:
-            self.selected_options_1.pop(text, None)
-
-    def on_checkbox_toggled_2(self, text, checked):
-        if checked:
-            self.selected_options_2[text] = True
-        else:
-            self.selected_options_2.pop(text, None)
-
-    def on_checkbox_toggled_3(self, text, checked):
-        if checked:
-            self.selected_options_3[text] = True
-        else:
-            self.selected_options_3.pop(text, None)
+        self.setStyleSheet(_FORM_QSS)
+        self.setUpdatesEnabled(True)
+
+    def _mk_checkboxes(self, texts, group: int) -> list[QCheckBox]:
+        """数据驱动地批量建复选框：构造时给定 parent（少一次悬空顶层态），
+        组号写入动态属性并统一接到共享槽。"""
+        boxes = []
+        for t in texts:
+            cb = QCheckBox(t, self)
+            cb.setProperty("group", group)
+            cb.toggled.connect(self._on_any_toggled)
+            boxes.append(cb)
+        return boxes
+
+    # 选项记录（后续可以导出 JSON）：三组复选框共用一个槽，
+    # 组号放在动态属性里、文本从 sender() 取，不再逐个生成 lambda 闭包
+    @Slot(bool)
+    def _on_any_toggled(self, checked):
+        cb = self.sender()
+        if cb is None:
+            return
+        s = (self.selected_options_1, self.selected_options_2,
+             self.selected_options_3)[cb.property("group") - 1]
+        (s.add if checked else s.discard)(cb.text())
 
 
 # ---------- 独立可跑的 InfoWidget（可选） ----------
@@ -489,3 +604,8 @@ class InfoWidget(QWidget):
         self.host.drawer.lbl_title.setText("医生标注")
         self.host.drawer.scroll_layout.addWidget(self.form)
         self.host.drawer.scroll_layout.addStretch(1)
+
+        # 折叠/展开会改 sizeHint，让抽屉下次重新测量宽度
+        for g in self.form.findChildren(CollapsibleGroupBox):
+            g.toggled_by_user.connect(
+                lambda *_: self.host.drawer.invalidate_width_cache())
@@ -1,961 +1,1346 @@
-from __future__ import annotations
-
-from pathlib import Path
-from PySide6.QtCore import *
-from PySide6.QtGui import *
-from PySide6.QtWidgets import *
-import openslide
-import numpy as np
-from concurrent.futures import ThreadPoolExecutor
-import threading
-
-from InfoWidget import OverlayHost, InfoFormWidget
-from AtypicalWidget import AtypicalWidget
-
-
-# ------------------------- LRU 瓦片缓存 -------------------------
-class TileCache:
-    def __init__(self, max_size=1200):
-        self.cache = {}
-        self.access_order = []
-        self.max_size = max_size
-        self.lock = threading.Lock()
-
-    def get(self, key):
-        with self.lock:
-            if key in self.cache:
-                try:
-                    self.access_order.remove(key)
-                except ValueError:
-                    pass
-                self.access_order.append(key)
-                return self.cache[key]
-        return None
-
-    def put(self, key, value):
-        with self.lock:
-            if key not in self.cache:
-                if len(self.access_order) >= self.max_size:
-                    oldest = self.access_order.pop(0)
-                    self.cache.pop(oldest, None)
-                self.cache[key] = value
-                self.access_order.append(key)
-
-    def clear(self):
-        with self.lock:
-            self.cache.clear()
-            self.access_order.clear()
-
-
-# ------------------------- OpenSlide 封装 -------------------------
-class WSIViewer:
-    def __init__(self, file_path: str):
-        self.slide = openslide.OpenSlide(file_path)
-        self.cache = TileCache(max_size=1600)
-
-        props = self.slide.properties
-        self.mpp_x = None
-        try:
-            if "openslide.mpp-x" in props:
-                self.mpp_x = float(props.get("openslide.mpp-x"))
-        except Exception:
-            self.mpp_x = None
-
-    def read_tile(self, x_l0: int, y_l0: int, tile_size: int, level: int):
-        """从 level-0 坐标读取指定 level 的 tile。"""
-        key = (level, x_l0, y_l0, tile_size)
-        cached = self.cache.get(key)
-        if cached is not None:
-            return cached
-        region = self.slide.read_region((x_l0, y_l0), level, (tile_size, tile_size)).convert("RGB")
-        arr = np.array(region)
-        self.cache.put(key, arr)
-        return arr
-
-    def get_dimensions(self, level: int):
-        return self.slide.level_dimensions[level]
-
-    def get_level_count(self) -> int:
-        return self.slide.level_count
-
-    def get_downsample(self, level: int):
-        return self.slide.level_downsamples[level]
-
-    def get_thumbnail_np(self, max_size: int = 512) -> np.ndarray:
-        """返回整体缩略图的 numpy 数组 (H, W, 3)。"""
-        thumb = self.slide.get_thumbnail((max_size, max_size)).convert("RGB")
-        return np.array(thumb)
-
-    def close(self):
-        self.slide.close()
-        self.cache.clear()
-
-
-# ------------------------- 比例尺控件（固定在视口底部） -------------------------
-class ScaleBarWidget(QWidget):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.mpp = None
-        self.view_scale = 1.0  # level-0 像素到屏幕像素的缩放
-        self.setFixedHeight(36)
-        self.setAttribute(Qt.WA_TransparentForMouseEvents, True)
-
-    def set_mpp(self, mpp: float | None):
-        self.mpp = mpp
-        self.update()
-
-    def set_view_scale(self, s: float):
-        self.view_scale = s
-        self.update()
-
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHints(QPainter.Antialiasing | QPainter.TextAntialiasing)
-        painter.fillRect(self.rect(), QColor(0, 0, 0, 150))
-
-        rect = self.rect().adjusted(12, 8, -12, -8)
-        if not self.mpp or self.mpp <= 0:
-            bar_len_px = rect.width() * 0.5
-            label = f"{int(bar_len_px)} px"
-        else:
-            px_per_um = self.view_scale / self.mpp  # 1μm 对应多少屏幕像素
-            nice_um = [10, 20, 50, 100, 200, 500, 1000, 2000]
-            target_px = rect.width() * 0.5
-            best_um = nice_um[0]
-            best_px = best_um * px_per_um
-            best_diff = float("inf")
-            for um in nice_um:
-                px = um * px_per_um
-                diff = abs(px - target_px)
-                if diff < best_diff:
-                    best_diff = diff
-                    best_um = um
-                    best_px = px
-            bar_len_px = max(40, min(rect.width() - 40, best_px))
-            label = f"{best_um} μm"
-
-        x = rect.center().x() - bar_len_px / 2
-        y = rect.center().y()
-        painter.setPen(QPen(Qt.white, 2))
-        painter.drawLine(QPointF(x, y), QPointF(x + bar_len_px, y))
-        painter.setFont(QFont("Arial", 8))
-        painter.drawText(QRectF(x, y + 4, bar_len_px, 16), Qt.AlignCenter, label)
-
-
-# ------------------------- 左上角 HUD 覆盖层 -------------------------
-class HudOverlay(QWidget):
-    """
-    固定在视口左上角，显示：
-    - 文件名
-    - 缩放倍率 + level 信息
-    - 鼠标当前位置（level-0 坐标）
-    """
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self._file = ""
-        self._zoom = ""
-        self._coord = ""
-        self.setAttribute(Qt.WA_TransparentForMouseEvents, True)
-
-    def set_file(self, name: str):
-        self._file = name
-        self.update()
-
-    def set_zoom(self, text: str):
-        self._zoom = text
-        self.update()
-
-    def set_coord(self, text: str):
-        self._coord = text
-        self.update()
-
-    def paintEvent(self, event):
-        if not (self._file or self._zoom or self._coord):
-            return
-        painter = QPainter(self)
-        painter.setRenderHints(QPainter.Antialiasing | QPainter.TextAntialiasing)
-
-        # 半透明背景
-        rect = self.rect().adjusted(4, 4, -4, -4)
-        painter.setBrush(QColor(0, 0, 0, 160))
-        painter.setPen(Qt.NoPen)
-        painter.drawRoundedRect(rect, 8, 8)
-
-        # 文本
-        painter.setPen(Qt.white)
-        font = painter.font()
-        font.setPointSize(9)
-        painter.setFont(font)
-        y = rect.top() + 6
-        line_h = 14
-        if self._file:
-            painter.drawText(rect.left() + 8, y + line_h, f"文件: {self._file}")
-            y += line_h
-        if self._zoom:
-            painter.drawText(rect.left() + 8, y + line_h, f"倍率: {self._zoom}")
-            y += line_h
-        if self._coord:
-            painter.drawText(rect.left() + 8, y + line_h, f"坐标: {self._coord}")
-
-
-# ------------------------- 左下角 Overview / Minimap -------------------------
-class OverviewWidget(QWidget):
-    """
-    左下角整体缩略图 + 视野框，支持点击/拖动物件进行快速导航。
-    与 MainWidget 通过 level-0 坐标交互。
-    """
-    requestCenterOn = Signal(float, float)  # level-0 center x, y
-
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setFixedSize(220, 220)
-        self.setAttribute(Qt.WA_StyledBackground, True)
-        self.setMouseTracking(True)
-
-        self._pix: QPixmap | None = None
-        self._full_w = 1
-        self._full_h = 1
-        self._ratio_x = 1.0
-        self._ratio_y = 1.0
-        self._view_rect_l0: QRectF | None = None
-
-        self._dragging = False
-
-    def set_overview(self, pixmap: QPixmap, full_size: tuple[int, int]):
-        self._full_w, self._full_h = full_size
-        # 缩放到适合本控件大小
-        scaled = pixmap.scaled(self.size() - QSize(8, 8), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self._pix = scaled
-        self._ratio_x = self._pix.width() / self._full_w
-        self._ratio_y = self._pix.height() / self._full_h
-        self.update()
-
-    def clear(self):
-        self._pix = None
-        self._view_rect_l0 = None
-        self.update()
-
-    def update_view_rect(self, rect_l0: QRectF):
-        self._view_rect_l0 = rect_l0
-        self.update()
-
-    # 内部辅助：将 widget 中点转换到 level-0 坐标
-    def _to_level0(self, pos: QPointF) -> tuple[float, float]:
-        if not self._pix:
-            return 0.0, 0.0
-        w = self.width()
-        h = self.height()
-        px_w = self._pix.width()
-        px_h = self._pix.height()
-        # 居中绘制的偏移
-        offset_x = (w - px_w) / 2
-        offset_y = (h - px_h) / 2
-        x = (pos.x() - offset_x) / self._ratio_x
-        y = (pos.y() - offset_y) / self._ratio_y
-        x = max(0.0, min(float(self._full_w), float(x)))
-        y = max(0.0, min(float(self._full_h), float(y)))
-        return x, y
-
-    def mousePressEvent(self, event: QMouseEvent):
-        if event.button() == Qt.LeftButton and self._pix:
-            self._dragging = True
-            cx, cy = self._to_level0(event.position())
-            self.requestCenterOn.emit(cx, cy)
-            self.update()
-
-    def mouseMoveEvent(self, event: QMouseEvent):
-        if self._dragging and self._pix:
-            cx, cy = self._to_level0(event.position())
-            self.requestCenterOn.emit(cx, cy)
-            self.update()
-
-    def mouseReleaseEvent(self, event: QMouseEvent):
-        if event.button() == Qt.LeftButton:
-            self._dragging = False
-
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.fillRect(self.rect(), QColor(0, 0, 0, 160))
-
-        if not self._pix:
-            painter.setPen(Qt.white)
-            painter.drawText(self.rect(), Qt.AlignCenter, "无缩略图")
-            return
-
-        w = self.width()
-        h = self.height()
-        px_w = self._pix.width()
-        px_h = self._pix.height()
-        offset_x = (w - px_w) / 2
-        offset_y = (h - px_h) / 2
-
-        # 画缩略图
-        painter.drawPixmap(int(offset_x), int(offset_y), self._pix)
-
-        # 画视野框
-        if self._view_rect_l0:
-            rv = self._view_rect_l0
-            x = rv.x() * self._ratio_x + offset_x
-            y = rv.y() * self._ratio_y + offset_y
-            rw = rv.width() * self._ratio_x
-            rh = rv.height() * self._ratio_y
-
-            painter.setPen(QPen(QColor(255, 255, 0), 2))
-            painter.setBrush(Qt.NoBrush)
-            painter.drawRect(QRectF(x, y, rw, rh))
-
-
-# ------------------------- 主界面 -------------------------
-class MainWidget(QWidget):
-    file_loaded = Signal(str)
-    tile_loaded = Signal(int, int, int, object)  # x, y, level, np.ndarray
-
-    def __init__(self):
-        super().__init__()
-        self.font = QFont("Microsoft YaHei", 11)
-
-        # 复核面板
-        self.review_panel = AtypicalWidget("./config.yaml", parent=self)
-        self.review_panel.requestOpenInWSI.connect(self.centerOnRect)
-
-        # WSI 状态
-        self.wsi_viewer: WSIViewer | None = None
-        self.wsi_tile_items = {}    # {(lv,x,y): QGraphicsPixmapItem}
-        self.pending_tasks = set()  # {(lv,x,y)}
-        self.current_level = 0
-        self.TILE_SIZE = 512
-        self.MAX_TILES_PER_REQUEST = 256
-        self.MAX_TILES_ON_SCENE = 2500
-
-        self._current_file_name = ""
-        self._last_coord_text = ""
-
-        # 线程池
-        self.executor = ThreadPoolExecutor(max_workers=8)
-
-        # 场景 + 视图
-        self.scene = QGraphicsScene(self)
-        self.graphics_view = QGraphicsView(self.scene)
-        self.graphics_view.setRenderHints(QPainter.Antialiasing | QPainter.SmoothPixmapTransform)
-        self.graphics_view.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
-        self.graphics_view.setResizeAnchor(QGraphicsView.AnchorUnderMouse)
-        self.graphics_view.setDragMode(QGraphicsView.ScrollHandDrag)
-        self.graphics_view.viewport().installEventFilter(self)
-        self.graphics_view.viewport().setMouseTracking(True)
-
-        self._roi_rect_item: QGraphicsRectItem | None = None
-
-        # 覆盖层：比例尺 / HUD / Overview
-        self.scale_bar = ScaleBarWidget(self.graphics_view.viewport())
-        self.scale_bar.hide()
-
-        self.hud = HudOverlay(self.graphics_view.viewport())
-        self.hud.hide()
-
-        self.overview = OverviewWidget(self.graphics_view.viewport())
-        self.overview.hide()
-        self.overview.requestCenterOn.connect(self._center_from_overview)
-
-        self.tile_loaded.connect(self._on_tile_loaded)
-
-        # 刷新调度
-        self._update_timer = QTimer(self)
-        self._update_timer.setSingleShot(True)
-        self._update_timer.timeout.connect(self._do_update)
-
-        self._init_control()
-
-        # 快捷键：Ctrl+E 切换右侧抽屉
-        QShortcut(QKeySequence("Ctrl+E"), self, activated=self.toggle_right_panel)
-
-        # 快捷键：缩放 / 平移
-        QShortcut(QKeySequence(Qt.Key_Plus), self, activated=lambda: self._zoom_step(1.2))
-        QShortcut(QKeySequence(Qt.Key_Minus), self, activated=lambda: self._zoom_step(1 / 1.2))
-
-    # ------------------------- UI -------------------------
-    def _init_control(self):
-        main_layout = QVBoxLayout(self)
-        main_layout.setContentsMargins(0, 0, 0, 0)
-        main_layout.setSpacing(0)
-
-        self.host = OverlayHost(self, drawer_base_width=420, anim_ms=220)
-        main_layout.addWidget(self.host)
-
-        # 中央内容：影像浏览页面
-        view_page = QWidget()
-        v = QVBoxLayout(view_page)
-        v.setContentsMargins(8, 8, 8, 8)
-        v.setSpacing(4)
-
-        # 顶部工具条
-        top_bar = QHBoxLayout()
-        self.logo_label = QLabel()
-        pixmap = QPixmap("../../icon/logo1.png")
-        if not pixmap.isNull():
-            scaled_pixmap = pixmap.scaled(150, 150, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self.logo_label.setPixmap(scaled_pixmap)
-        self.logo_label.setFixedSize(75, 40)
-        self.logo_label.setScaledContents(True)
-        top_bar.addWidget(self.logo_label)
-
-        self.show_queue_btn = QPushButton("返回上一界面")
-        self.show_queue_btn.setFixedHeight(30)
-        self.show_queue_btn.setFlat(True)
-        self.show_queue_btn.setIcon(QIcon("../../icon/return.png"))
-        self.show_queue_btn.setIconSize(QSize(15, 15))
-        self.show_queue_btn.setStyleSheet("""
-            QPushButton {
-                background-color:#BBFFFF;
-                padding: 5px;
-                border: 2px solid #555555;
-                border-radius: 5px;
-                font-size: 14px;
-                font: bold;
-            }
-            QPushButton:hover { background-color: #AEEEEE; }
-        """)
-        top_bar.addWidget(self.show_queue_btn)
-
-        top_bar.addStretch(1)
-        top_bar.addWidget(QLabel("|", self))
-
-        # 导入 / 清除
-        self.btn_load = QPushButton("导入图片")
-        self.btn_load.setFixedHeight(30)
-        self.btn_load.setStyleSheet("""
-            QPushButton {
-                background-color:#1976D2;
-                color:white;
-                border-radius:5px;
-                padding:5px 10px;
-            }
-            QPushButton:hover { background-color:#1565C0; }
-        """)
-        self.btn_load.clicked.connect(self.on_icon_button_clicked)
-        top_bar.addWidget(self.btn_load)
-
-        self.remove_queue_btn = QPushButton("清除图像")
-        self.remove_queue_btn.setFixedHeight(30)
-        self.remove_queue_btn.setStyleSheet("""
-            QPushButton {
-                background-color:#F8BBD0;
-                border-radius:5px;
-                padding:5px 10px;
-                font-size:12px;
-            }
-            QPushButton:hover { background-color:#F48FB1; }
-        """)
-        self.remove_queue_btn.clicked.connect(self.remove_image)
-        top_bar.addWidget(self.remove_queue_btn)
-
-        top_bar.addWidget(QLabel("|", self))
-
-        # 常用倍率按钮
-        for text, scale_factor in [("1x", 1.0), ("2x", 2.0), ("4x", 4.0), ("10x", 10.0)]:
-            button = QPushButton(text)
-            button.setFixedSize(40, 30)
-            button.setStyleSheet("""
-                QPushButton {
-                    background-color:#FFEFD5;
-                    border: 1px solid #555555;
-                    padding: 5px;
-                    border-radius: 5px;
-                    font-size: 11px;
-                }
-                QPushButton:hover { background-color:#FFDEAD; }
-            """)
-            button.clicked.connect(lambda _=False, f=scale_factor: self.set_view_scale(f))
-            top_bar.addWidget(button)
-
-        self.fit_button = QPushButton("Fit")
-        self.fit_button.setFixedWidth(40)
-        self.fit_button.setStyleSheet("""
-            QPushButton {
-                background-color:#E0F7FA;
-                border: 1px solid #555555;
-                padding: 5px;
-                border-radius: 5px;
-                font-size: 12px;
-                font: bold;
-            }
-            QPushButton:hover { background-color:#B2EBF2; }
-        """)
-        self.fit_button.clicked.connect(self.fit_in_view)
-        top_bar.addWidget(self.fit_button)
-
-        v.addLayout(top_bar)
-        v.addWidget(self.graphics_view, 1)
-
-        self.host.tab.addTab(view_page, "影像浏览")
-
-        # 抽屉内容：Tab1 Info，Tab2 复核
-        self.host.drawer.lbl_title.setText("医生标注 & Patch 复核")
-        self.drawer_tabs = QTabWidget()
-        self.drawer_tabs.setTabPosition(QTabWidget.North)
-        self.drawer_tabs.setDocumentMode(True)
-
-        self.info_form = InfoFormWidget()
-        self.drawer_tabs.addTab(self.info_form, "医生标注")
-        self.drawer_tabs.addTab(self.review_panel, "Patch 复核")
-
-        # 顶部模式按钮
-        mode_row = QHBoxLayout()
-        mode_row.setSpacing(8)
-        lbl = QLabel("模式：")
-        mode_row.addWidget(lbl)
-        self.btn_mode_info = QPushButton("医生标注")
-        self.btn_mode_review = QPushButton("复核列表")
-        for b in (self.btn_mode_info, self.btn_mode_review):
-            b.setCheckable(True)
-            b.setMinimumWidth(80)
-            b.setStyleSheet("""
-                QPushButton {
-                    border-radius: 6px;
-                    border: 1px solid #90CAF9;
-                    padding: 6px 10px;
-                    background:#E3F2FD;
-                }
-                QPushButton:checked {
-                    background:#1976D2;
-                    color:white;
-                    border-color:#1565C0;
-                }
-            """)
-            mode_row.addWidget(b)
-        mode_row.addStretch(1)
-
-        self.btn_mode_info.setChecked(True)
-        self.btn_mode_info.clicked.connect(lambda: self._switch_drawer_tab(0))
-        self.btn_mode_review.clicked.connect(lambda: self._switch_drawer_tab(1))
-        self.drawer_tabs.currentChanged.connect(self._sync_mode_buttons)
-
-        self.host.drawer.scroll_layout.addLayout(mode_row)
-        self.host.drawer.scroll_layout.addWidget(self.drawer_tabs)
-        self.host.drawer.scroll_layout.addStretch(1)
-
-    def _switch_drawer_tab(self, idx: int):
-        self.drawer_tabs.setCurrentIndex(idx)
-
-    def _sync_mode_buttons(self, idx: int):
-        self.btn_mode_info.blockSignals(True)
-        self.btn_mode_review.blockSignals(True)
-        self.btn_mode_info.setChecked(idx == 0)
-        self.btn_mode_review.setChecked(idx == 1)
-        self.btn_mode_info.blockSignals(False)
-        self.btn_mode_review.blockSignals(False)
-
-    # ------------------------- 快捷键控制抽屉 -------------------------
-    def toggle_right_panel(self):
-        self.host.toggleDrawer()
-
-    # ------------------------- 文件加载/清除 -------------------------
-    def on_icon_button_clicked(self):
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "选择WSI图像", "", "TIF/WSI Files (*.tif *.svs *.ndpi);;All Files (*)"
-        )
-        if file_path:
-            self.open_slide(file_path)
-
-    def open_slide(self, file_path: str):
-        if self.wsi_viewer:
-            self.wsi_viewer.close()
-            self.wsi_viewer = None
-            self.scene.clear()
-            self.wsi_tile_items.clear()
-            self.pending_tasks.clear()
-
-        try:
-            self.wsi_viewer = WSIViewer(file_path)
-        except Exception as e:
-            QMessageBox.critical(self, "加载失败", f"打开 WSI 失败：\n{e}")
-            return
-
-        self._current_file_name = Path(file_path).name
-        self.hud.set_file(self._current_file_name)
-
-        self.file_loaded.emit(file_path)
-        # 初始先用中间层（如果有）
-        self.current_level = min(2, self.wsi_viewer.get_level_count() - 1)
-        dim = self.wsi_viewer.get_dimensions(self.current_level)
-        self.scene.clear()
-        self.wsi_tile_items.clear()
-        self.pending_tasks.clear()
-        self.scene.setSceneRect(0, 0, dim[0], dim[1])
-
-        # 比例尺
-        mpp = self.wsi_viewer.mpp_x
-        self.scale_bar.set_mpp(mpp)
-        self.scale_bar.show()
-
-        # Overview 缩略图（从 level-0 生成）
-        try:
-            thumb_arr = self.wsi_viewer.get_thumbnail_np(max_size=512)
-            h, w, _ = thumb_arr.shape
-            qimg = QImage(thumb_arr.data, w, h, w * 3, QImage.Format_RGB888)
-            pix = QPixmap.fromImage(qimg)
-            full_w, full_h = self.wsi_viewer.get_dimensions(0)
-            self.overview.set_overview(pix, (full_w, full_h))
-            self.overview.show()
-        except Exception:
-            self.overview.clear()
-            self.overview.hide()
-
-        # Fit 一下
-        self.fit_in_view()
-
-        # 复核面板同步
-        try:
-            self.review_panel.select_wsi(file_path)
-        except Exception as e:
-            QMessageBox.information(self, "提示", f"复核面板载入结果失败：{e}")
-
-    def remove_image(self):
-        if self.wsi_viewer:
-            self.scene.clear()
-            self.wsi_tile_items.clear()
-            self.pending_tasks.clear()
-            self.wsi_viewer.close()
-            self.wsi_viewer = None
-            self._clear_roi_rect()
-        self.scale_bar.hide()
-        self.overview.clear()
-        self.overview.hide()
-        self.hud.set_zoom("")
-        self.hud.set_coord("")
-
-    # ------------------------- 视图缩放/平移 -------------------------
-    def fit_in_view(self):
-        if not self.scene.items():
-            return
-        self.graphics_view.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
-        self.request_update(force=True)
-
-    def set_view_scale(self, factor: float):
-        if not self.wsi_viewer:
-            return
-        self.graphics_view.resetTransform()
-        self.graphics_view.scale(factor, factor)
-        self.request_update(force=True)
-
-    def _zoom_step(self, factor: float):
-        """键盘 +/- 缩放，以视口中心为锚点。"""
-        if not self.wsi_viewer:
-            return
-        vp = self.graphics_view.viewport().rect()
-        center_pos = QPointF(vp.center())
-        self._zoom_at(center_pos, factor)
-
-    def _zoom_at(self, pos: QPointF, factor: float):
-        if not self.wsi_viewer:
-            return
-        before = self.graphics_view.mapToScene(pos.toPoint())
-        self.graphics_view.scale(factor, factor)
-        after = self.graphics_view.mapToScene(pos.toPoint())
-        delta = after - before
-        self.graphics_view.translate(delta.x(), delta.y())
-        self.request_update()
-
-    def centerOnRect(self, patch_id: str, x: int, y: int, w: int, h: int):
-        rect = QRectF(x, y, w, h)
-        if rect.isNull():
-            return
-        self.graphics_view.fitInView(rect, Qt.KeepAspectRatio)
-        self.request_update(force=True)
-
-        if self._roi_rect_item is not None:
-            try:
-                self.scene.removeItem(self._roi_rect_item)
-            except Exception:
-                pass
-            self._roi_rect_item = None
-
-        pen = QPen(Qt.red, 3, Qt.DashLine)
-        self._roi_rect_item = self.scene.addRect(rect, pen)
-        QTimer.singleShot(1500, self._clear_roi_rect)
-
-    def _clear_roi_rect(self):
-        if self._roi_rect_item is not None:
-            try:
-                self.scene.removeItem(self._roi_rect_item)
-            except Exception:
-                pass
-            self._roi_rect_item = None
-
-    def _center_from_overview(self, cx0: float, cy0: float):
-        """由 OverviewWidget 发起，cx0,cy0 为 level-0 坐标。"""
-        if not self.wsi_viewer:
-            return
-        ds = self.wsi_viewer.get_downsample(self.current_level)
-        cx = cx0 / ds
-        cy = cy0 / ds
-        self.graphics_view.centerOn(QPointF(cx, cy))
-        self.request_update(force=True)
-
-    # ------------------------- 事件过滤：滚轮缩放 + 双击缩放 + 鼠标坐标 HUD -------------------------
-    def eventFilter(self, obj, event):
-        if obj is self.graphics_view.viewport():
-            # 滚轮缩放
-            if isinstance(event, QWheelEvent):
-                if not self.wsi_viewer:
-                    return True
-                angle = event.angleDelta().y()
-                if angle == 0:
-                    return True
-                steps = angle / 120.0
-                factor = pow(1.15, steps)
-                self._zoom_at(event.position(), factor)
-                return True
-            # 双击缩放（左键放大，右键缩小）
-            if event.type() == QEvent.MouseButtonDblClick:
-                if not self.wsi_viewer:
-                    return True
-                if event.button() == Qt.LeftButton:
-                    self._zoom_at(event.position(), 1.8)
-                elif event.button() == Qt.RightButton:
-                    self._zoom_at(event.position(), 1 / 1.8)
-                return True
-            # 鼠标移动时更新 HUD 坐标
-            if event.type() == QEvent.MouseMove and self.wsi_viewer:
-                pos = event.position().toPoint()
-                scene_pt = self.graphics_view.mapToScene(pos)
-                ds = self.wsi_viewer.get_downsample(self.current_level)
-                x0 = int(scene_pt.x() * ds)
-                y0 = int(scene_pt.y() * ds)
-                self._last_coord_text = f"{x0}, {y0}"
-                self.hud.set_coord(self._last_coord_text)
-        return super().eventFilter(obj, event)
-
-    # ------------------------- 动态选择 level + 更新 HUD / Overview / ScaleBar -------------------------
-    def _update_overlays_geometry(self):
-        vp_rect = self.graphics_view.viewport().rect()
-        # HUD 左上角固定
-        hud_w, hud_h = 260, 70
-        self.hud.setGeometry(10, 10, hud_w, hud_h)
-        self.hud.show()
-
-        # Overview 左下角，略高于比例尺
-        if self.overview.isVisible():
-            ow, oh = self.overview.width(), self.overview.height()
-            margin = 10
-            sb_h = self.scale_bar.height() if self.scale_bar.isVisible() else 0
-            x = margin
-            y = vp_rect.height() - oh - sb_h - margin
-            if y < 0:
-                y = 0
-            self.overview.setGeometry(x, y, ow, oh)
-
-    def _update_scale_bar_and_hud(self):
-        if not self.wsi_viewer:
-            return
-        t = self.graphics_view.transform()
-        view_scale = t.m11()
-
-        # 根据 view_scale 粗略选择更合适的 level
-        self._maybe_change_level(view_scale)
-
-        # 此时 current_level 可能已变
-        ds = self.wsi_viewer.get_downsample(self.current_level)
-        global_scale = view_scale / ds  # level-0 像素到屏幕像素
-
-        # 更新比例尺
-        self.scale_bar.set_view_scale(global_scale)
-        r = self.graphics_view.viewport().rect()
-        self.scale_bar.setGeometry(0, r.height() - self.scale_bar.height(), r.width(), self.scale_bar.height())
-        self.scale_bar.show()
-
-        # 更新 HUD 的倍率显示
-        zoom_text = f"{global_scale:.2f}x (L{self.current_level})"
-        self.hud.set_zoom(zoom_text)
-
-        # 更新 HUD / Overview 几何
-        self._update_overlays_geometry()
-        self._update_overview_rect()
-
-    def _update_overview_rect(self):
-        """根据当前视口更新 Overview 中的视野框（使用 level-0 坐标）。"""
-        if not (self.wsi_viewer and self.overview.isVisible()):
-            return
-        rect_scene = self.graphics_view.mapToScene(self.graphics_view.viewport().rect()).boundingRect()
-        ds = self.wsi_viewer.get_downsample(self.current_level)
-        rect_l0 = QRectF(
-            rect_scene.x() * ds,
-            rect_scene.y() * ds,
-            rect_scene.width() * ds,
-            rect_scene.height() * ds,
-        )
-        self.overview.update_view_rect(rect_l0)
-
-    def _maybe_change_level(self, view_scale: float):
-        """
-        根据当前 view_scale 粗略决定是否切换 OpenSlide level。
-        简单策略：
-        - view_scale 太大 -> 切到更细的 level（索引减一）
-        - view_scale 太小 -> 切到更粗的 level（索引加一）
-        """
-        if not self.wsi_viewer:
-            return
-        max_level = self.wsi_viewer.get_level_count() - 1
-        old_level = self.current_level
-
-        upper = 2.4
-        lower = 0.7
-
-        if view_scale > upper and self.current_level > 0:
-            self.current_level -= 1
-        elif view_scale < lower and self.current_level < max_level:
-            self.current_level += 1
-
-        if self.current_level != old_level:
-            self._reload_scene_for_level(old_level)
-
-    def _reload_scene_for_level(self, old_level: int):
-        """切换 level 时，保持视口中心位置（在 level-0 坐标系下尽量不变）"""
-        if not self.wsi_viewer:
-            return
-        view = self.graphics_view
-        old_ds = self.wsi_viewer.get_downsample(old_level)
-        new_ds = self.wsi_viewer.get_downsample(self.current_level)
-
-        center_scene_old = view.mapToScene(view.viewport().rect().center())
-        cx0 = center_scene_old.x() * old_ds
-        cy0 = center_scene_old.y() * old_ds
-
-        dim = self.wsi_viewer.get_dimensions(self.current_level)
-        self.scene.setSceneRect(0, 0, dim[0], dim[1])
-
-        self.scene.clear()
-        self.wsi_tile_items.clear()
-        self.pending_tasks.clear()
-        self._clear_roi_rect()
-
-        center_scene_new = QPointF(cx0 / new_ds, cy0 / new_ds)
-        view.centerOn(center_scene_new)
-        self.request_update(force=True)
-
-    # ------------------------- 刷新调度 -------------------------
-    def request_update(self, force=False):
-        if force:
-            self._update_timer.stop()
-            self._do_update()
-        else:
-            self._update_timer.start(25)
-
-    def _do_update(self):
-        self.update_visible_tiles()
-        self._update_scale_bar_and_hud()
-
-    # ------------------------- 瓦片调度：视野中心优先 + 限量 -------------------------
-    def update_visible_tiles(self):
-        if not self.wsi_viewer:
-            return
-
-        rect = self.graphics_view.mapToScene(self.graphics_view.viewport().rect()).boundingRect()
-        rect = rect.intersected(self.scene.sceneRect())
-        if rect.isEmpty():
-            return
-
-        tile = self.TILE_SIZE
-        x0 = int(rect.left()) // tile * tile
-        y0 = int(rect.top()) // tile * tile
-        x1 = int(rect.right())
-        y1 = int(rect.bottom())
-
-        # 控制场景内图元数量，过多则主动回收一部分
-        if len(self.wsi_tile_items) > self.MAX_TILES_ON_SCENE:
-            for k, it in list(self.wsi_tile_items.items())[: len(self.wsi_tile_items) // 3]:
-                self.scene.removeItem(it)
-                self.wsi_tile_items.pop(k, None)
-
-        # 移除不可见 tile（带 margin）
-        margin = tile
-        to_remove = []
-        for (lv, tx, ty), item in self.wsi_tile_items.items():
-            if lv != self.current_level:
-                to_remove.append((lv, tx, ty))
-                continue
-            if tx + tile < x0 - margin or tx > x1 + margin or ty + tile < y0 - margin or ty > y1 + margin:
-                to_remove.append((lv, tx, ty))
-        for key in to_remove:
-            item = self.wsi_tile_items.pop(key)
-            self.scene.removeItem(item)
-
-        # 中心优先调度 tile
-        ds = self.wsi_viewer.get_downsample(self.current_level)
-        center = rect.center()
-
-        candidates = []
-        for y in range(y0, y1 + tile, tile):
-            for x in range(x0, x1 + tile, tile):
-                key = (self.current_level, x, y)
-                if key in self.wsi_tile_items or key in self.pending_tasks:
-                    continue
-                cx = x + tile / 2
-                cy = y + tile / 2
-                dist2 = (cx - center.x()) ** 2 + (cy - center.y()) ** 2
-                candidates.append((dist2, x, y))
-
-        candidates.sort(key=lambda t: t[0])
-
-        count = 0
-        for _, x, y in candidates:
-            if count >= self.MAX_TILES_PER_REQUEST:
-                break
-            key = (self.current_level, x, y)
-            self.pending_tasks.add(key)
-            lv = self.current_level
-            x_l0 = int(x * ds)
-            y_l0 = int(y * ds)
-            tsize = tile
-
-            def task(lv=lv, tx=x, ty=y, x0=x_l0, y0=y_l0, t=tsize):
-                arr = self.wsi_viewer.read_tile(x0, y0, t, lv)
-                self.tile_loaded.emit(tx, ty, lv, arr)
-
-            self.executor.submit(task)
-            count += 1
-
-    @Slot(int, int, int, object)
-    def _on_tile_loaded(self, x: int, y: int, level: int, arr: object):
-        key = (level, x, y)
-        self.pending_tasks.discard(key)
-        if arr is None or not isinstance(arr, np.ndarray):
-            return
-        if not self.wsi_viewer or level != self.current_level:
-            return
-        if key in self.wsi_tile_items:
-            return
-
-        h, w, _ = arr.shape
-        qimg = QImage(arr.data, w, h, w * 3, QImage.Format_RGB888)
-        pix = QPixmap.fromImage(qimg)
-        item = QGraphicsPixmapItem(pix)
-        item.setOffset(x, y)
-        self.scene.addItem(item)
-        self.wsi_tile_items[key] = item
-
-    # ------------------------- 重载 resizeEvent：保持 overlay 位置 -------------------------
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        # 视图大小变化时，重新布置 HUD / Overview / ScaleBar
-        self._update_scale_bar_and_hud()
-
-    # ------------------------- 方向键平移 -------------------------
-    def keyPressEvent(self, event: QKeyEvent):
-        if not self.wsi_viewer:
-            return super().keyPressEvent(event)
-        step = 80
-        if event.key() == Qt.Key_Left:
-            self.graphics_view.translate(step, 0)
-            self.request_update()
-        elif event.key() == Qt.Key_Right:
-            self.graphics_view.translate(-step, 0)
-            self.request_update()
-        elif event.key() == Qt.Key_Up:
-            self.graphics_view.translate(0, step)
-            self.request_update()
-        elif event.key() == Qt.Key_Down:
-            self.graphics_view.translate(0, -step)
-            self.request_update()
-        else:
-            super().keyPressEvent(event)
+from __future__ import annotations
+
+from pathlib import Path
+from PySide6.QtCore import *
+from PySide6.QtGui import *
+from PySide6.QtWidgets import *
+import openslide
+import numpy as np
+from PIL import Image
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import ctypes
+import threading
+
+from InfoWidget import OverlayHost, InfoFormWidget
+from AtypicalWidget import AtypicalWidget
+
+
+# 空白瓦片哨兵：WSI 的大片空区只占一个 cache 槽位，不做 QPixmap 上传
+_EMPTY_TILE = object()
+
+
+def _pack_tile_key(lv: int, x: int, y: int) -> int:
+    """(lv,x,y) 压成单个 int 做字典键：整数哈希比三元组便宜，
+    候选循环每格两三次成员判断，省掉的元组分配可观。x/y 为场景
+    坐标（非负、远小于 2^24）。"""
+    return (lv << 48) | (x << 24) | y
+
+
+# ------------------------- LRU 瓦片缓存 -------------------------
+class TileCache:
+    """分片 LRU：16 个 (OrderedDict, Lock) 条带按 hash 路由，
+    多个解码线程命中不同条带时互不阻塞；每片内部仍是
+    move_to_end/popitem 的均摊 O(1) LRU。"""
+
+    _SHARDS = 16
+
+    def __init__(self, max_size=1200):
+        per_shard = max(1, max_size // self._SHARDS)
+        self._shards = [
+            (OrderedDict(), threading.Lock(), per_shard)
+            for _ in range(self._SHARDS)
+        ]
+
+    def _shard(self, key):
+        return self._shards[hash(key) & (self._SHARDS - 1)]
+
+    def get(self, key):
+        cache, lock, _ = self._shard(key)
+        with lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        cache, lock, cap = self._shard(key)
+        with lock:
+            if key in cache:
+                cache.move_to_end(key)
+            else:
+                cache[key] = value
+                if len(cache) > cap:
+                    cache.popitem(last=False)
+
+    def clear(self):
+        for cache, lock, _ in self._shards:
+            with lock:
+                cache.clear()
+
+
+# ------------------------- OpenSlide 封装 -------------------------
+class WSIViewer:
+    def __init__(self, file_path: str):
+        self.slide = openslide.OpenSlide(file_path)
+        self.cache = TileCache(max_size=1600)
+        self._lowlevel_ok = True  # 首次失败后不再尝试私有接口
+
+        props = self.slide.properties
+        self.mpp_x = None
+        try:
+            if "openslide.mpp-x" in props:
+                self.mpp_x = float(props.get("openslide.mpp-x"))
+        except Exception:
+            self.mpp_x = None
+
+    def read_tile(self, x_l0: int, y_l0: int, tile_size: int, level: int):
+        """从 level-0 坐标读取指定 level 的 tile。
+
+        返回 (H,W,4) 预乘 BGRA 或兜底的 (H,W,3) RGB，由通道数区分。
+        """
+        key = (level, x_l0, y_l0, tile_size)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        arr = self._read_region_bgra(x_l0, y_l0, tile_size, level)
+        if arr is None:
+            region = self.slide.read_region((x_l0, y_l0), level, (tile_size, tile_size))
+            # 兜底路径也在工作线程把 RGBA 重排成 ARGB32 内存布局
+            # （小端 BGRA、alpha=255），GUI 线程只剩零拷贝包装
+            rgba = np.asarray(region)
+            arr = np.empty_like(rgba)
+            arr[..., 0] = rgba[..., 2]
+            arr[..., 1] = rgba[..., 1]
+            arr[..., 2] = rgba[..., 0]
+            arr[..., 3] = 255
+        # 稀疏采样判空：全白或全透明的瓦片只缓存哨兵
+        sample = arr[::64, ::64]
+        if sample.min() > 248 or (arr.shape[2] == 4 and not sample[..., 3].any()):
+            self.cache.put(key, _EMPTY_TILE)
+            return _EMPTY_TILE
+        self.cache.put(key, arr)
+        return arr
+
+    def _read_region_bgra(self, x_l0: int, y_l0: int, tile_size: int, level: int):
+        """lowlevel._read_region 直接往 numpy 缓冲里写 OpenSlide 原生的
+        预乘 ARGB（即 QImage.Format_ARGB32_Premultiplied 的内存布局），
+        跳过 PIL 的 RGBA 重排；私有接口不可用时返回 None 走 PIL 兜底。"""
+        if not self._lowlevel_ok:
+            return None
+        try:
+            buf = np.empty((tile_size, tile_size, 4), np.uint8)
+            p = buf.ctypes.data_as(ctypes.POINTER(ctypes.c_uint32))
+            openslide.lowlevel._read_region(
+                self.slide._osr, p, x_l0, y_l0, level, tile_size, tile_size
+            )
+            return buf
+        except Exception:
+            self._lowlevel_ok = False
+            return None
+
+    def get_dimensions(self, level: int):
+        return self.slide.level_dimensions[level]
+
+    def get_level_count(self) -> int:
+        return self.slide.level_count
+
+    def get_downsample(self, level: int):
+        return self.slide.level_downsamples[level]
+
+    def get_thumbnail_np(self, max_size: int = 512) -> np.ndarray:
+        """返回整体缩略图的 numpy 数组 (H, W, 3)。
+
+        直接读最小的预存层再缩，比 get_thumbnail 让 Pillow 从大层
+        降采样少几个数量级的像素工作量。
+        """
+        lvl = self.slide.level_count - 1
+        w, h = self.slide.level_dimensions[lvl]
+        img = self.slide.read_region((0, 0), lvl, (w, h)).convert("RGB")
+        if max(w, h) > max_size:
+            img.thumbnail((max_size, max_size), Image.BILINEAR)
+        return np.array(img)
+
+    def close(self):
+        self.slide.close()
+        self.cache.clear()
+
+
+# ------------------------- 比例尺控件（固定在视口底部） -------------------------
+class ScaleBarWidget(QWidget):
+    # 候选刻度一次建成数组，paintEvent 里用 argmin 选最近值
+    NICE_UM = np.array([10, 20, 50, 100, 200, 500, 1000, 2000], dtype=np.float32)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.mpp = None
+        self.view_scale = 1.0  # level-0 像素到屏幕像素的缩放
+        self.setFixedHeight(36)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents, True)
+
+    def set_mpp(self, mpp: float | None):
+        self.mpp = mpp
+        self.update()
+
+    def set_view_scale(self, s: float):
+        self.view_scale = s
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHints(QPainter.Antialiasing | QPainter.TextAntialiasing)
+        painter.fillRect(self.rect(), QColor(0, 0, 0, 150))
+
+        rect = self.rect().adjusted(12, 8, -12, -8)
+        if not self.mpp or self.mpp <= 0:
+            bar_len_px = rect.width() * 0.5
+            label = f"{int(bar_len_px)} px"
+        else:
+            px_per_um = self.view_scale / self.mpp  # 1μm 对应多少屏幕像素
+            target_px = rect.width() * 0.5
+            px = self.NICE_UM * px_per_um
+            i = int(np.argmin(np.abs(px - target_px)))
+            best_um = int(self.NICE_UM[i])
+            best_px = float(px[i])
+            bar_len_px = max(40, min(rect.width() - 40, best_px))
+            label = f"{best_um} μm"
+
+        x = rect.center().x() - bar_len_px / 2
+        y = rect.center().y()
+        painter.setPen(QPen(Qt.white, 2))
+        painter.drawLine(QPointF(x, y), QPointF(x + bar_len_px, y))
+        painter.setFont(QFont("Arial", 8))
+        painter.drawText(QRectF(x, y + 4, bar_len_px, 16), Qt.AlignCenter, label)
+
+
+# ------------------------- 左上角 HUD 覆盖层 -------------------------
+class HudOverlay(QWidget):
+    """
+    固定在视口左上角，显示：
+    - 文件名
+    - 缩放倍率 + level 信息
+    - 鼠标当前位置（level-0 坐标）
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._file = ""
+        self._zoom = ""
+        self._coord = ""
+        self.setAttribute(Qt.WA_TransparentForMouseEvents, True)
+
+        # 字体与三段文本只在 setter 里变：QStaticText 缓存排版结果，
+        # 高频重绘（鼠标移动）时不再每次做 text shaping
+        self._font = QFont()
+        self._font.setPointSize(9)
+        self._t_file = QStaticText()
+        self._t_zoom = QStaticText()
+        self._t_coord = QStaticText()
+        for t in (self._t_file, self._t_zoom, self._t_coord):
+            t.setPerformanceHint(QStaticText.AggressiveCaching)
+
+    def set_file(self, name: str):
+        self._file = name
+        self._t_file.setText(f"文件: {name}")
+        self.update()
+
+    def set_zoom(self, text: str):
+        self._zoom = text
+        self._t_zoom.setText(f"倍率: {text}")
+        self.update()
+
+    def set_coord(self, text: str):
+        self._coord = text
+        self._t_coord.setText(f"坐标: {text}")
+        self.update()
+
+    def paintEvent(self, event):
+        if not (self._file or self._zoom or self._coord):
+            return
+        painter = QPainter(self)
+        painter.setRenderHints(QPainter.Antialiasing | QPainter.TextAntialiasing)
+
+        # 半透明背景
+        rect = self.rect().adjusted(4, 4, -4, -4)
+        painter.setBrush(QColor(0, 0, 0, 160))
+        painter.setPen(Qt.NoPen)
+        painter.drawRoundedRect(rect, 8, 8)
+
+        # 文本
+        painter.setPen(Qt.white)
+        painter.setFont(self._font)
+        y = rect.top() + 6
+        line_h = 14
+        if self._file:
+            painter.drawStaticText(rect.left() + 8, y, self._t_file)
+            y += line_h
+        if self._zoom:
+            painter.drawStaticText(rect.left() + 8, y, self._t_zoom)
+            y += line_h
+        if self._coord:
+            painter.drawStaticText(rect.left() + 8, y, self._t_coord)
+
+
+# ------------------------- 左下角 Overview / Minimap -------------------------
+class OverviewWidget(QWidget):
+    """
+    左下角整体缩略图 + 视野框，支持点击/拖动物件进行快速导航。
+    与 MainWidget 通过 level-0 坐标交互。
+    """
+    requestCenterOn = Signal(float, float, bool)  # level-0 center x, y, 是否为最终位置
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFixedSize(220, 220)
+        self.setAttribute(Qt.WA_StyledBackground, True)
+        self.setMouseTracking(True)
+
+        # 拖动导航按 ~60Hz 合并转发：每次 move 都 centerOn 会反复
+        # 清空瓦片管线；中间位置不强制刷新，松手时才发最终位置
+        self._pending_center = None
+        self._center_timer = QTimer(self)
+        self._center_timer.setSingleShot(True)
+        self._center_timer.setInterval(16)
+        self._center_timer.timeout.connect(self._flush_center)
+
+        self._pix: QPixmap | None = None
+        self._full_w = 1
+        self._full_h = 1
+        self._ratio_x = 1.0
+        self._ratio_y = 1.0
+        self._view_rect_l0: QRectF | None = None
+
+        self._dragging = False
+
+    def set_overview(self, pixmap: QPixmap, full_size: tuple[int, int]):
+        self._full_w, self._full_h = full_size
+        # 缩放到适合本控件大小
+        scaled = pixmap.scaled(self.size() - QSize(8, 8), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self._pix = scaled
+        self._ratio_x = self._pix.width() / self._full_w
+        self._ratio_y = self._pix.height() / self._full_h
+        self.update()
+
+    def clear(self):
+        self._pix = None
+        self._view_rect_l0 = None
+        self.update()
+
+    def update_view_rect(self, rect_l0: QRectF):
+        self._view_rect_l0 = rect_l0
+        self.update()
+
+    # 内部辅助：将 widget 中点转换到 level-0 坐标
+    def _to_level0(self, pos: QPointF) -> tuple[float, float]:
+        if not self._pix:
+            return 0.0, 0.0
+        w = self.width()
+        h = self.height()
+        px_w = self._pix.width()
+        px_h = self._pix.height()
+        # 居中绘制的偏移
+        offset_x = (w - px_w) / 2
+        offset_y = (h - px_h) / 2
+        x = (pos.x() - offset_x) / self._ratio_x
+        y = (pos.y() - offset_y) / self._ratio_y
+        x = max(0.0, min(float(self._full_w), float(x)))
+        y = max(0.0, min(float(self._full_h), float(y)))
+        return x, y
+
+    def mousePressEvent(self, event: QMouseEvent):
+        if event.button() == Qt.LeftButton and self._pix:
+            self._dragging = True
+            cx, cy = self._to_level0(event.position())
+            self.requestCenterOn.emit(cx, cy, False)
+            self.update()
+
+    def mouseMoveEvent(self, event: QMouseEvent):
+        if self._dragging and self._pix:
+            self._pending_center = self._to_level0(event.position())
+            if not self._center_timer.isActive():
+                self._center_timer.start()
+            self.update()
+
+    @Slot()
+    def _flush_center(self):
+        if self._pending_center is not None:
+            cx, cy = self._pending_center
+            self._pending_center = None
+            self.requestCenterOn.emit(cx, cy, False)
+
+    def mouseReleaseEvent(self, event: QMouseEvent):
+        if event.button() == Qt.LeftButton:
+            if self._dragging and self._pix:
+                self._center_timer.stop()
+                self._pending_center = None
+                cx, cy = self._to_level0(event.position())
+                self.requestCenterOn.emit(cx, cy, True)
+            self._dragging = False
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), QColor(0, 0, 0, 160))
+
+        if not self._pix:
+            painter.setPen(Qt.white)
+            painter.drawText(self.rect(), Qt.AlignCenter, "无缩略图")
+            return
+
+        w = self.width()
+        h = self.height()
+        px_w = self._pix.width()
+        px_h = self._pix.height()
+        offset_x = (w - px_w) / 2
+        offset_y = (h - px_h) / 2
+
+        # 画缩略图
+        painter.drawPixmap(int(offset_x), int(offset_y), self._pix)
+
+        # 画视野框
+        if self._view_rect_l0:
+            rv = self._view_rect_l0
+            x = rv.x() * self._ratio_x + offset_x
+            y = rv.y() * self._ratio_y + offset_y
+            rw = rv.width() * self._ratio_x
+            rh = rv.height() * self._ratio_y
+
+            painter.setPen(QPen(QColor(255, 255, 0), 2))
+            painter.setBrush(Qt.NoBrush)
+            painter.drawRect(QRectF(x, y, rw, rh))
+
+
+# ------------------------- 主界面 -------------------------
+class MainWidget(QWidget):
+    # 滚轮缩放因子查表：整数 steps 直接取预算好的 1.15^i，免一次 libm pow
+    _ZOOM_LUT = tuple(1.15 ** i for i in range(-20, 21))
+
+    file_loaded = Signal(str)
+    tile_loaded = Signal(int, int, int, object, int)  # x, y, level, np.ndarray, gen
+    thumb_loaded = Signal(object, int)           # Overview 缩略图 np.ndarray（失败为 None）+ 打开序号
+    slide_opened = Signal(object, str, str, int)  # viewer/None, 路径, 错误信息, 打开序号
+
+    def __init__(self):
+        super().__init__()
+        self.font = QFont("Microsoft YaHei", 11)
+
+        # 复核面板
+        self.review_panel = AtypicalWidget("./config.yaml", parent=self)
+        self.review_panel.requestOpenInWSI.connect(self.centerOnRect)
+
+        # WSI 状态
+        self.wsi_viewer: WSIViewer | None = None
+        self.wsi_tile_items = OrderedDict()  # {打包键: QGraphicsPixmapItem}，超限按离视口中心距离批量淘汰
+        # 回收的图元池：淘汰只隐藏，复用时 setPixmap/setOffset，
+        # 省掉 addItem/removeItem 的场景图增删
+        self._free_items = []
+        # GUI 线程侧的 QPixmap 缓存：命中则直接上屏，连工作线程都不用进；
+        # 与 WSIViewer.cache（工作线程侧的像素数组）分开，QPixmap 只在 GUI 线程碰
+        self.pixmap_cache = TileCache(max_size=1200)
+        self.pending_tasks = set()  # {打包键}，见 _pack_tile_key
+        self.current_level = 0
+        # 当前层 downsample 的缓存：get_downsample 是 FFI 调用，
+        # 鼠标移动等热路径里不再逐次去问 OpenSlide
+        self._current_ds = 1.0
+        # 视图代际号：缩放/换层时自增，旧代际的瓦片结果直接丢弃，
+        # 快速拖拽时不再为已划过的视野做解码上屏
+        self._gen = 0
+        self.TILE_SIZE = 512
+        self.MAX_TILES_PER_REQUEST = 256
+        self.MAX_TILES_ON_SCENE = 2500
+
+        self._current_file_name = ""
+        self._last_coord_text = ""
+        # 每轮 _do_update 只做一次 mapToScene 多边形映射，各处复用
+        self._view_scene_rect: QRectF | None = None
+        # 方向键平移的累积量，_do_update 统一应用
+        self._pending_pan_dx = 0
+        self._pending_pan_dy = 0
+
+        # 线程池
+        self.executor = ThreadPoolExecutor(max_workers=8)
+        # 低优先级预取池：外圈 + 相邻 level 的瓦片提前解码进 TileCache，
+        # 只有 2 个线程，不会和可见瓦片抢 IO
+        self.prefetch_exec = ThreadPoolExecutor(max_workers=2)
+        self._prefetch_seen = set()  # {(lv,x,y)}，避免重复排队
+        self._empty_tiles = set()    # {打包键}，判空的瓦片不再重复请求
+
+        # 二级全局缓存：QPixmapCache 以"片路径+瓦片键"存活过本控件的
+        # 换片清理，重新打开同一张片子时直接命中。上限是进程全局的，
+        # 别的控件也会设，只抬不降，和构造顺序解耦
+        QPixmapCache.setCacheLimit(max(QPixmapCache.cacheLimit(), 256 * 1024))  # KB
+        self._slide_key = ""
+
+        # 场景 + 视图
+        self.scene = QGraphicsScene(self)
+        # 瓦片集合每帧增删，BSP 索引反复重建得不偿失；瓦片互不重叠
+        # 也不做任意命中测试，线性索引反而更快
+        self.scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+        # 空白瓦片不建图元，底色由背景刷统一画
+        self.scene.setBackgroundBrush(Qt.white)
+        self.graphics_view = QGraphicsView(self.scene)
+        self.graphics_view.setRenderHints(QPainter.Antialiasing | QPainter.SmoothPixmapTransform)
+        self.graphics_view.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
+        self.graphics_view.setOptimizationFlag(QGraphicsView.DontSavePainterState, True)
+        self.graphics_view.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
+        self.graphics_view.setResizeAnchor(QGraphicsView.AnchorUnderMouse)
+        self.graphics_view.setDragMode(QGraphicsView.ScrollHandDrag)
+        self.graphics_view.viewport().installEventFilter(self)
+        self.graphics_view.viewport().setMouseTracking(True)
+
+        self._roi_rect_item: QGraphicsRectItem | None = None
+
+        # 覆盖层：比例尺 / HUD / Overview
+        self.scale_bar = ScaleBarWidget(self.graphics_view.viewport())
+        self.scale_bar.hide()
+
+        self.hud = HudOverlay(self.graphics_view.viewport())
+        self.hud.hide()
+
+        self.overview = OverviewWidget(self.graphics_view.viewport())
+        self.overview.hide()
+        self.overview.requestCenterOn.connect(self._center_from_overview)
+
+        self.tile_loaded.connect(self._on_tile_loaded)
+        self.thumb_loaded.connect(self._on_thumb_loaded)
+        self.slide_opened.connect(self._on_slide_opened)
+        self._open_seq = 0  # 连续打开时只认最后一次
+
+        # 刷新调度
+        self._update_timer = QTimer(self)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.timeout.connect(self._do_update)
+
+        # HUD 坐标按 ~60Hz 合并刷新：高回报率鼠标每次移动都重绘太浪费
+        self._hud_timer = QTimer(self)
+        self._hud_timer.setSingleShot(True)
+        self._hud_timer.setInterval(16)
+        self._hud_timer.timeout.connect(self._flush_hud_coord)
+
+        # 纯平移时比例尺/HUD/Overview 内容基本不变，降到 100ms 一档；
+        # 缩放（view_scale 变了）才立即走完整的 overlay 更新 + 换层判断
+        self._last_view_scale = 0.0
+        self._overlay_timer = QTimer(self)
+        self._overlay_timer.setSingleShot(True)
+        self._overlay_timer.setInterval(100)
+        self._overlay_timer.timeout.connect(self._update_scale_bar_and_hud)
+
+        self._init_control()
+
+        # 快捷键：Ctrl+E 切换右侧抽屉
+        QShortcut(QKeySequence("Ctrl+E"), self, activated=self.toggle_right_panel)
+
+        # 快捷键：缩放 / 平移
+        QShortcut(QKeySequence(Qt.Key_Plus), self, activated=lambda: self._zoom_step(1.2))
+        QShortcut(QKeySequence(Qt.Key_Minus), self, activated=lambda: self._zoom_step(1 / 1.2))
+
+    # ------------------------- UI -------------------------
+    def _init_control(self):
+        main_layout = QVBoxLayout(self)
+        main_layout.setContentsMargins(0, 0, 0, 0)
+        main_layout.setSpacing(0)
+
+        self.host = OverlayHost(self, drawer_base_width=420, anim_ms=220)
+        main_layout.addWidget(self.host)
+
+        # 中央内容：影像浏览页面
+        view_page = QWidget()
+        v = QVBoxLayout(view_page)
+        v.setContentsMargins(8, 8, 8, 8)
+        v.setSpacing(4)
+
+        # 顶部工具条
+        top_bar = QHBoxLayout()
+        self.logo_label = QLabel()
+        pixmap = QPixmap("../../icon/logo1.png")
+        if not pixmap.isNull():
+            scaled_pixmap = pixmap.scaled(150, 150, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self.logo_label.setPixmap(scaled_pixmap)
+        self.logo_label.setFixedSize(75, 40)
+        self.logo_label.setScaledContents(True)
+        top_bar.addWidget(self.logo_label)
+
+        self.show_queue_btn = QPushButton("返回上一界面")
+        self.show_queue_btn.setFixedHeight(30)
+        self.show_queue_btn.setFlat(True)
+        self.show_queue_btn.setIcon(QIcon("../../icon/return.png"))
+        self.show_queue_btn.setIconSize(QSize(15, 15))
+        self.show_queue_btn.setStyleSheet("""
+            QPushButton {
+                background-color:#BBFFFF;
+                padding: 5px;
+                border: 2px solid #555555;
+                border-radius: 5px;
+                font-size: 14px;
+                font: bold;
+            }
+            QPushButton:hover { background-color: #AEEEEE; }
+        """)
+        top_bar.addWidget(self.show_queue_btn)
+
+        top_bar.addStretch(1)
+        top_bar.addWidget(QLabel("|", self))
+
+        # 导入 / 清除
+        self.btn_load = QPushButton("导入图片")
+        self.btn_load.setFixedHeight(30)
+        self.btn_load.setStyleSheet("""
+            QPushButton {
+                background-color:#1976D2;
+                color:white;
+                border-radius:5px;
+                padding:5px 10px;
+            }
+            QPushButton:hover { background-color:#1565C0; }
+        """)
+        self.btn_load.clicked.connect(self.on_icon_button_clicked)
+        top_bar.addWidget(self.btn_load)
+
+        self.remove_queue_btn = QPushButton("清除图像")
+        self.remove_queue_btn.setFixedHeight(30)
+        self.remove_queue_btn.setStyleSheet("""
+            QPushButton {
+                background-color:#F8BBD0;
+                border-radius:5px;
+                padding:5px 10px;
+                font-size:12px;
+            }
+            QPushButton:hover { background-color:#F48FB1; }
+        """)
+        self.remove_queue_btn.clicked.connect(self.remove_image)
+        top_bar.addWidget(self.remove_queue_btn)
+
+        top_bar.addWidget(QLabel("|", self))
+
+        # 常用倍率按钮
+        for text, scale_factor in [("1x", 1.0), ("2x", 2.0), ("4x", 4.0), ("10x", 10.0)]:
+            button = QPushButton(text)
+            button.setFixedSize(40, 30)
+            button.setStyleSheet("""
+                QPushButton {
+                    background-color:#FFEFD5;
+                    border: 1px solid #555555;
+                    padding: 5px;
+                    border-radius: 5px;
+                    font-size: 11px;
+                }
+                QPushButton:hover { background-color:#FFDEAD; }
+            """)
+            button.clicked.connect(lambda _=False, f=scale_factor: self.set_view_scale(f))
+            top_bar.addWidget(button)
+
+        self.fit_button = QPushButton("Fit")
+        self.fit_button.setFixedWidth(40)
+        self.fit_button.setStyleSheet("""
+            QPushButton {
+                background-color:#E0F7FA;
+                border: 1px solid #555555;
+                padding: 5px;
+                border-radius: 5px;
+                font-size: 12px;
+                font: bold;
+            }
+            QPushButton:hover { background-color:#B2EBF2; }
+        """)
+        self.fit_button.clicked.connect(self.fit_in_view)
+        top_bar.addWidget(self.fit_button)
+
+        v.addLayout(top_bar)
+        v.addWidget(self.graphics_view, 1)
+
+        self.host.tab.addTab(view_page, "影像浏览")
+
+        # 抽屉内容：Tab1 Info，Tab2 复核
+        self.host.drawer.lbl_title.setText("医生标注 & Patch 复核")
+        self.drawer_tabs = QTabWidget()
+        self.drawer_tabs.setTabPosition(QTabWidget.North)
+        self.drawer_tabs.setDocumentMode(True)
+
+        self.info_form = InfoFormWidget()
+        self.drawer_tabs.addTab(self.info_form, "医生标注")
+        self.drawer_tabs.addTab(self.review_panel, "Patch 复核")
+
+        # 顶部模式按钮
+        mode_row = QHBoxLayout()
+        mode_row.setSpacing(8)
+        lbl = QLabel("模式：")
+        mode_row.addWidget(lbl)
+        self.btn_mode_info = QPushButton("医生标注")
+        self.btn_mode_review = QPushButton("复核列表")
+        for b in (self.btn_mode_info, self.btn_mode_review):
+            b.setCheckable(True)
+            b.setMinimumWidth(80)
+            b.setStyleSheet("""
+                QPushButton {
+                    border-radius: 6px;
+                    border: 1px solid #90CAF9;
+                    padding: 6px 10px;
+                    background:#E3F2FD;
+                }
+                QPushButton:checked {
+                    background:#1976D2;
+                    color:white;
+                    border-color:#1565C0;
+                }
+            """)
+            mode_row.addWidget(b)
+        mode_row.addStretch(1)
+
+        self.btn_mode_info.setChecked(True)
+        self.btn_mode_info.clicked.connect(lambda: self._switch_drawer_tab(0))
+        self.btn_mode_review.clicked.connect(lambda: self._switch_drawer_tab(1))
+        self.drawer_tabs.currentChanged.connect(self._sync_mode_buttons)
+
+        self.host.drawer.scroll_layout.addLayout(mode_row)
+        self.host.drawer.scroll_layout.addWidget(self.drawer_tabs)
+        self.host.drawer.scroll_layout.addStretch(1)
+
+    def _switch_drawer_tab(self, idx: int):
+        self.drawer_tabs.setCurrentIndex(idx)
+
+    def _sync_mode_buttons(self, idx: int):
+        self.btn_mode_info.blockSignals(True)
+        self.btn_mode_review.blockSignals(True)
+        self.btn_mode_info.setChecked(idx == 0)
+        self.btn_mode_review.setChecked(idx == 1)
+        self.btn_mode_info.blockSignals(False)
+        self.btn_mode_review.blockSignals(False)
+
+    # ------------------------- 快捷键控制抽屉 -------------------------
+    def toggle_right_panel(self):
+        self.host.toggleDrawer()
+
+    # ------------------------- 文件加载/清除 -------------------------
+    def on_icon_button_clicked(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "选择WSI图像", "", "TIF/WSI Files (*.tif *.svs *.ndpi);;All Files (*)"
+        )
+        if file_path:
+            self.open_slide(file_path)
+
+    def open_slide(self, file_path: str):
+        if self.wsi_viewer:
+            self.wsi_viewer.close()
+            self.wsi_viewer = None
+            self.scene.clear()
+            self._free_items.clear()  # scene.clear() 已销毁池内图元
+            self.wsi_tile_items.clear()
+            self.pending_tasks.clear()
+            self.pixmap_cache.clear()
+            self._prefetch_seen.clear()
+            self._empty_tiles.clear()
+
+        # OpenSlide 打开文件（网络盘上可能要数秒）也放到工作线程，
+        # 结果经 slide_opened 信号回 GUI 线程继续装配
+        self._open_seq += 1
+        seq = self._open_seq
+
+        def open_task():
+            try:
+                viewer = WSIViewer(file_path)
+                self.slide_opened.emit(viewer, file_path, "", seq)
+            except Exception as e:
+                self.slide_opened.emit(None, file_path, str(e), seq)
+
+        self.executor.submit(open_task)
+
+    @Slot(object, str, str, int)
+    def _on_slide_opened(self, viewer: object, file_path: str, err: str, seq: int):
+        if seq != self._open_seq:
+            # 期间又发起了新的打开/清除，丢弃这个过期结果
+            if viewer is not None:
+                viewer.close()
+            return
+        if viewer is None:
+            QMessageBox.critical(self, "加载失败", f"打开 WSI 失败：\n{err}")
+            return
+        self.wsi_viewer = viewer
+        self._slide_key = file_path
+
+        self._current_file_name = Path(file_path).name
+        self.hud.set_file(self._current_file_name)
+
+        self.file_loaded.emit(file_path)
+        # 初始先用中间层（如果有）
+        self.current_level = min(2, self.wsi_viewer.get_level_count() - 1)
+        self._current_ds = self.wsi_viewer.get_downsample(self.current_level)
+        dim = self.wsi_viewer.get_dimensions(self.current_level)
+        self.scene.clear()
+        self._free_items.clear()  # scene.clear() 已销毁池内图元
+        self.wsi_tile_items.clear()
+        self.pending_tasks.clear()
+        self.scene.setSceneRect(0, 0, dim[0], dim[1])
+
+        # 比例尺
+        mpp = self.wsi_viewer.mpp_x
+        self.scale_bar.set_mpp(mpp)
+        self.scale_bar.show()
+
+        # Overview 缩略图放到工作线程生成（最深层读取也可能要数秒），
+        # 结果经 thumb_loaded 信号回 GUI 线程再构建 QImage/QPixmap
+        viewer = self.wsi_viewer
+
+        def thumb_task():
+            try:
+                arr = viewer.get_thumbnail_np(max_size=512)
+            except Exception:
+                arr = None
+            self.thumb_loaded.emit(arr, seq)
+
+        self.executor.submit(thumb_task)
+
+        # Fit 一下
+        self.fit_in_view()
+
+        # 复核面板同步
+        try:
+            self.review_panel.select_wsi(file_path)
+        except Exception as e:
+            QMessageBox.information(self, "提示", f"复核面板载入结果失败：{e}")
+
+    def remove_image(self):
+        self._open_seq += 1  # 作废仍在工作线程里的打开请求
+        if self.wsi_viewer:
+            self.scene.clear()
+            self._free_items.clear()  # scene.clear() 已销毁池内图元
+            self.wsi_tile_items.clear()
+            self.pending_tasks.clear()
+            self.pixmap_cache.clear()
+            self._prefetch_seen.clear()
+            self._empty_tiles.clear()
+            self.wsi_viewer.close()
+            self.wsi_viewer = None
+            self._clear_roi_rect()
+        self.scale_bar.hide()
+        self.overview.clear()
+        self.overview.hide()
+        self.hud.set_zoom("")
+        self.hud.set_coord("")
+
+    # ------------------------- 视图缩放/平移 -------------------------
+    def fit_in_view(self):
+        if not self.scene.items():
+            return
+        self._gen += 1
+        self.graphics_view.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
+        self.request_update(force=True)
+
+    def set_view_scale(self, factor: float):
+        if not self.wsi_viewer:
+            return
+        self.graphics_view.resetTransform()
+        self.graphics_view.scale(factor, factor)
+        self.request_update(force=True)
+
+    def _zoom_step(self, factor: float):
+        """键盘 +/- 缩放，以视口中心为锚点。"""
+        if not self.wsi_viewer:
+            return
+        vp = self.graphics_view.viewport().rect()
+        center_pos = QPointF(vp.center())
+        self._zoom_at(center_pos, factor)
+
+    def _zoom_at(self, pos: QPointF, factor: float):
+        if not self.wsi_viewer:
+            return
+        self._gen += 1
+        before = self.graphics_view.mapToScene(pos.toPoint())
+        self.graphics_view.scale(factor, factor)
+        after = self.graphics_view.mapToScene(pos.toPoint())
+        delta = after - before
+        self.graphics_view.translate(delta.x(), delta.y())
+        self.request_update()
+
+    def centerOnRect(self, patch_id: str, x: int, y: int, w: int, h: int):
+        rect = QRectF(x, y, w, h)
+        if rect.isNull():
+            return
+        self.graphics_view.fitInView(rect, Qt.KeepAspectRatio)
+        self.request_update(force=True)
+
+        if self._roi_rect_item is not None:
+            try:
+                self.scene.removeItem(self._roi_rect_item)
+            except Exception:
+                pass
+            self._roi_rect_item = None
+
+        pen = QPen(Qt.red, 3, Qt.DashLine)
+        self._roi_rect_item = self.scene.addRect(rect, pen)
+        QTimer.singleShot(1500, self._clear_roi_rect)
+
+    def _clear_roi_rect(self):
+        if self._roi_rect_item is not None:
+            try:
+                self.scene.removeItem(self._roi_rect_item)
+            except Exception:
+                pass
+            self._roi_rect_item = None
+
+    def _center_from_overview(self, cx0: float, cy0: float, final: bool):
+        """由 OverviewWidget 发起，cx0,cy0 为 level-0 坐标；
+        拖动中间位置走防抖刷新，松手才强制刷新。"""
+        if not self.wsi_viewer:
+            return
+        ds = self._current_ds
+        cx = cx0 / ds
+        cy = cy0 / ds
+        self.graphics_view.centerOn(QPointF(cx, cy))
+        self.request_update(force=final)
+
+    # ------------------------- 事件过滤：滚轮缩放 + 双击缩放 + 鼠标坐标 HUD -------------------------
+    def eventFilter(self, obj, event):
+        if obj is self.graphics_view.viewport():
+            # 滚轮缩放
+            if isinstance(event, QWheelEvent):
+                if not self.wsi_viewer:
+                    return True
+                angle = event.angleDelta().y()
+                if angle == 0:
+                    return True
+                steps = angle / 120.0
+                if steps == int(steps) and -20 <= steps <= 20:
+                    factor = self._ZOOM_LUT[int(steps) + 20]
+                else:
+                    factor = 1.15 ** steps  # 触控板的分数步进走慢路径
+                self._zoom_at(event.position(), factor)
+                return True
+            # 双击缩放（左键放大，右键缩小）
+            if event.type() == QEvent.MouseButtonDblClick:
+                if not self.wsi_viewer:
+                    return True
+                if event.button() == Qt.LeftButton:
+                    self._zoom_at(event.position(), 1.8)
+                elif event.button() == Qt.RightButton:
+                    self._zoom_at(event.position(), 1 / 1.8)
+                return True
+            # 鼠标移动时更新 HUD 坐标
+            if event.type() == QEvent.MouseMove and self.wsi_viewer:
+                pos = event.position().toPoint()
+                scene_pt = self.graphics_view.mapToScene(pos)
+                ds = self._current_ds
+                x0 = int(scene_pt.x() * ds)
+                y0 = int(scene_pt.y() * ds)
+                text = f"{x0}, {y0}"
+                if text != self._last_coord_text:
+                    self._last_coord_text = text
+                    if not self._hud_timer.isActive():
+                        self._hud_timer.start()
+        return super().eventFilter(obj, event)
+
+    @Slot()
+    def _flush_hud_coord(self):
+        self.hud.set_coord(self._last_coord_text)
+
+    # ------------------------- 动态选择 level + 更新 HUD / Overview / ScaleBar -------------------------
+    def _update_overlays_geometry(self):
+        vp_rect = self.graphics_view.viewport().rect()
+        # HUD 左上角固定
+        hud_w, hud_h = 260, 70
+        self.hud.setGeometry(10, 10, hud_w, hud_h)
+        self.hud.show()
+
+        # Overview 左下角，略高于比例尺
+        if self.overview.isVisible():
+            ow, oh = self.overview.width(), self.overview.height()
+            margin = 10
+            sb_h = self.scale_bar.height() if self.scale_bar.isVisible() else 0
+            x = margin
+            y = vp_rect.height() - oh - sb_h - margin
+            if y < 0:
+                y = 0
+            self.overview.setGeometry(x, y, ow, oh)
+
+    def _update_scale_bar_and_hud(self):
+        if not self.wsi_viewer:
+            return
+        t = self.graphics_view.transform()
+        view_scale = t.m11()
+
+        # 根据 view_scale 粗略选择更合适的 level
+        self._maybe_change_level(view_scale)
+
+        # 此时 current_level 可能已变
+        ds = self._current_ds
+        global_scale = view_scale / ds  # level-0 像素到屏幕像素
+
+        # 更新比例尺
+        self.scale_bar.set_view_scale(global_scale)
+        r = self.graphics_view.viewport().rect()
+        self.scale_bar.setGeometry(0, r.height() - self.scale_bar.height(), r.width(), self.scale_bar.height())
+        self.scale_bar.show()
+
+        # 更新 HUD 的倍率显示
+        zoom_text = f"{global_scale:.2f}x (L{self.current_level})"
+        self.hud.set_zoom(zoom_text)
+
+        # 更新 HUD / Overview 几何
+        self._update_overlays_geometry()
+        self._update_overview_rect()
+
+    def _update_overview_rect(self):
+        """根据当前视口更新 Overview 中的视野框（使用 level-0 坐标）。"""
+        if not (self.wsi_viewer and self.overview.isVisible()):
+            return
+        if self._view_scene_rect is None:
+            self._refresh_view_scene_rect()
+        rect_scene = self._view_scene_rect
+        ds = self._current_ds
+        rect_l0 = QRectF(
+            rect_scene.x() * ds,
+            rect_scene.y() * ds,
+            rect_scene.width() * ds,
+            rect_scene.height() * ds,
+        )
+        self.overview.update_view_rect(rect_l0)
+
+    def _maybe_change_level(self, view_scale: float):
+        """
+        根据当前显示的 level-0 降采样率，让 OpenSlide 自己挑最近的存储层
+        （get_best_level_for_downsample），避免固定阈值下一次只挪一层、
+        read_region 还要在同层做大幅重采样。
+        """
+        if not self.wsi_viewer or view_scale <= 0:
+            return
+        old_level = self.current_level
+        ds = self._current_ds
+        # 屏幕上 1 像素对应多少个 level-0 像素
+        target_ds = max(1.0, ds / view_scale)
+        new_level = self.wsi_viewer.slide.get_best_level_for_downsample(target_ds)
+
+        if new_level != old_level:
+            self.current_level = new_level
+            self._reload_scene_for_level(old_level)
+
+    def _reload_scene_for_level(self, old_level: int):
+        """切换 level 时，保持视口中心位置（在 level-0 坐标系下尽量不变）"""
+        if not self.wsi_viewer:
+            return
+        view = self.graphics_view
+        old_ds = self._current_ds
+        new_ds = self.wsi_viewer.get_downsample(self.current_level)
+        self._current_ds = new_ds
+
+        self._gen += 1
+        center_scene_old = view.mapToScene(view.viewport().rect().center())
+        cx0 = center_scene_old.x() * old_ds
+        cy0 = center_scene_old.y() * old_ds
+
+        dim = self.wsi_viewer.get_dimensions(self.current_level)
+        self.scene.setSceneRect(0, 0, dim[0], dim[1])
+
+        self.scene.clear()
+        self._free_items.clear()  # scene.clear() 已销毁池内图元
+        self.wsi_tile_items.clear()
+        self.pending_tasks.clear()
+        self._prefetch_seen.clear()
+        self._clear_roi_rect()
+
+        center_scene_new = QPointF(cx0 / new_ds, cy0 / new_ds)
+        view.centerOn(center_scene_new)
+        self.request_update(force=True)
+
+    # ------------------------- 刷新调度 -------------------------
+    def request_update(self, force=False):
+        if force:
+            self._update_timer.stop()
+            self._do_update()
+        elif not self._update_timer.isActive():
+            self._update_timer.start(25)
+
+    def _do_update(self):
+        # 按键平移先累积，这里一次性应用：连发的方向键只换来一轮调度
+        if self._pending_pan_dx or self._pending_pan_dy:
+            self.graphics_view.translate(self._pending_pan_dx, self._pending_pan_dy)
+            self._pending_pan_dx = 0
+            self._pending_pan_dy = 0
+        self._refresh_view_scene_rect()
+        self.update_visible_tiles()
+        scale = self.graphics_view.transform().m11()
+        if scale != self._last_view_scale:
+            # 缩放变化可能触发换层，马上处理
+            self._last_view_scale = scale
+            self._overlay_timer.stop()
+            self._update_scale_bar_and_hud()
+        elif not self._overlay_timer.isActive():
+            self._overlay_timer.start()
+
+    def _refresh_view_scene_rect(self):
+        self._view_scene_rect = self.graphics_view.mapToScene(
+            self.graphics_view.viewport().rect()
+        ).boundingRect()
+
+    # ------------------------- 瓦片调度：视野中心优先 + 限量 -------------------------
+    def update_visible_tiles(self):
+        if not self.wsi_viewer:
+            return
+
+        if self._view_scene_rect is None:
+            self._refresh_view_scene_rect()
+        rect = self._view_scene_rect.intersected(self.scene.sceneRect())
+        if rect.isEmpty():
+            return
+
+        tile = self.TILE_SIZE
+        x0 = int(rect.left()) // tile * tile
+        y0 = int(rect.top()) // tile * tile
+        x1 = int(rect.right())
+        y1 = int(rect.bottom())
+
+        # 控制场景内图元数量，过多则回收离视口中心最远的一批
+        self._evict_far_tiles()
+
+        # 移除不可见 tile（带 margin）
+        margin = tile
+        cur = self.current_level
+        to_remove = []
+        for key in self.wsi_tile_items:
+            if (key >> 48) != cur:
+                to_remove.append(key)
+                continue
+            tx = (key >> 24) & 0xFFFFFF
+            ty = key & 0xFFFFFF
+            if tx + tile < x0 - margin or tx > x1 + margin or ty + tile < y0 - margin or ty > y1 + margin:
+                to_remove.append(key)
+        for key in to_remove:
+            self._recycle_item(self.wsi_tile_items.pop(key))
+
+        # 中心优先调度 tile：网格坐标与中心距离整批用 numpy 算，
+        # Python 层只按 argsort 顺序做成员判断和提交
+        ds = self._current_ds
+        center = rect.center()
+
+        xs = np.arange(x0, x1 + tile, tile)
+        ys = np.arange(y0, y1 + tile, tile)
+        gx, gy = np.meshgrid(xs, ys)
+        gx = gx.ravel()
+        gy = gy.ravel()
+        half = tile / 2
+        dist2 = (gx + half - center.x()) ** 2 + (gy + half - center.y()) ** 2
+        # 只需要最近的 K 个有序，其余更远的格子顺序无所谓：
+        # argpartition 把全量排序换成 O(N + K log K)
+        k = self.MAX_TILES_PER_REQUEST
+        if dist2.size > k:
+            part = np.argpartition(dist2, k)
+            near = part[:k]
+            order = np.concatenate((near[np.argsort(dist2[near])], part[k:]))
+        else:
+            order = np.argsort(dist2)
+
+        count = 0
+        to_submit = []  # [(lv, tx, ty, x_l0, y_l0)]
+        for i in order:
+            if count >= self.MAX_TILES_PER_REQUEST:
+                break
+            x = int(gx[i])
+            y = int(gy[i])
+            key = _pack_tile_key(self.current_level, x, y)
+            if key in self.wsi_tile_items or key in self.pending_tasks or key in self._empty_tiles:
+                continue
+            pix = self.pixmap_cache.get(key)
+            if pix is None:
+                # 本地缓存没有再查全局 QPixmapCache（跨换片存活）
+                pm = QPixmap()
+                if QPixmapCache.find(f"wsi:{self._slide_key}:{key}", pm):
+                    pix = pm
+                    self.pixmap_cache.put(key, pix)
+            if pix is not None:
+                # 缓存命中也要把 numpy 缓冲的引用带给图元：本地缓存
+                # 的 pixmap 像素在 _arr 里，缓存条目被 LRU 淘汰后
+                # 只剩图元在钉着它（全局缓存来的深拷贝没有 _arr）
+                self._place_tile_item(key, pix, x, y, getattr(pix, "_arr", None))
+                continue
+            self.pending_tasks.add(key)
+            to_submit.append((self.current_level, x, y, int(x * ds), int(y * ds)))
+            count += 1
+
+        if to_submit:
+            # 按线程数切成几份一次性提交：Future 分配和执行器锁从
+            # 每瓦片一次降到每批一次；轮转切分让每份都含近处瓦片
+            gen = self._gen
+            viewer = self.wsi_viewer
+            n = 8  # 与 executor 的 max_workers 对应
+            for part in (to_submit[i::n] for i in range(n)):
+                if part:
+                    self.executor.submit(self._read_tile_batch, viewer, part, tile, gen)
+
+        self._submit_prefetch(x0, y0, x1, y1, tile)
+
+    def _read_tile_batch(self, viewer: WSIViewer, batch: list, tile: int, gen: int):
+        """工作线程：顺序解码一份瓦片。翻代后剩余条目不再解码，
+        只发空结果让 GUI 侧清掉 pending 标记。"""
+        for lv, tx, ty, x_l0, y_l0 in batch:
+            if gen != self._gen:
+                self.tile_loaded.emit(tx, ty, lv, None, gen)
+                continue
+            arr = viewer.read_tile(x_l0, y_l0, tile, lv)
+            self.tile_loaded.emit(tx, ty, lv, arr, gen)
+
+    def _place_tile_item(self, key: int, pix: QPixmap, x: int, y: int, arr=None):
+        """优先复用池里的图元，没有才 addItem 建新的。"""
+        if self._free_items:
+            item = self._free_items.pop()
+            item.setPixmap(pix)
+            item.setOffset(x, y)
+            item.setVisible(True)
+        else:
+            item = QGraphicsPixmapItem(pix)
+            item.setOffset(x, y)
+            self.scene.addItem(item)
+        item._arr = arr
+        self.wsi_tile_items[key] = item
+
+    def _recycle_item(self, item):
+        """淘汰图元：隐藏并松开像素/缓冲引用，回池待复用。"""
+        item.setVisible(False)
+        item.setPixmap(QPixmap())
+        item._arr = None
+        self._free_items.append(item)
+
+    def _evict_far_tiles(self):
+        """图元数超过 MAX_TILES_ON_SCENE 时，按离视口中心的距离
+        一次性回收最远的一批（多留 10% 余量，避免每帧都触发）。"""
+        over = len(self.wsi_tile_items) - self.MAX_TILES_ON_SCENE
+        if over <= 0:
+            return
+        center = self.graphics_view.mapToScene(self.graphics_view.viewport().rect().center())
+        cx, cy = center.x(), center.y()
+        half = self.TILE_SIZE / 2
+        keys = sorted(
+            self.wsi_tile_items,
+            key=lambda k: ((k >> 24 & 0xFFFFFF) + half - cx) ** 2
+                          + ((k & 0xFFFFFF) + half - cy) ** 2,
+            reverse=True,
+        )
+        for k in keys[: over + self.MAX_TILES_ON_SCENE // 10]:
+            self._recycle_item(self.wsi_tile_items.pop(k))
+
+    def _submit_prefetch(self, x0: int, y0: int, x1: int, y1: int, tile: int,
+                         max_jobs: int = 64):
+        """把可见区外圈一圈 + 相邻 level 覆盖当前视野的瓦片排入预取池。
+
+        结果只进 TileCache（read_tile 自带缓存），不直接上屏；
+        换层 / 平移过去时对应瓦片已经解码完。
+        """
+        viewer = self.wsi_viewer
+        if viewer is None:
+            return
+        jobs = []  # [(lv, x, y, x_l0, y_l0)]
+        lv = self.current_level
+        ds = self._current_ds
+
+        # 当前层：可见范围外扩一圈
+        for y in range(y0 - tile, y1 + 2 * tile, tile):
+            for x in range(x0 - tile, x1 + 2 * tile, tile):
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    continue
+                if x < 0 or y < 0:
+                    continue
+                jobs.append((lv, x, y, int(x * ds), int(y * ds)))
+
+        # 相邻 level：覆盖当前视野的瓦片集合（level-0 坐标换算）
+        max_level = viewer.get_level_count() - 1
+        for lv2 in (lv - 1, lv + 1):
+            if not 0 <= lv2 <= max_level:
+                continue
+            ds2 = viewer.get_downsample(lv2)
+            sx0 = int(x0 * ds / ds2) // tile * tile
+            sy0 = int(y0 * ds / ds2) // tile * tile
+            sx1 = int(x1 * ds / ds2)
+            sy1 = int(y1 * ds / ds2)
+            for y in range(sy0, sy1 + tile, tile):
+                for x in range(sx0, sx1 + tile, tile):
+                    jobs.append((lv2, x, y, int(x * ds2), int(y * ds2)))
+
+        count = 0
+        gen = self._gen
+        for lv_j, x, y, x_l0, y_l0 in jobs:
+            if count >= max_jobs:
+                break
+            key = _pack_tile_key(lv_j, x, y)
+            if key in self._prefetch_seen or key in self.wsi_tile_items or key in self.pending_tasks:
+                continue
+            self._prefetch_seen.add(key)
+
+            def prefetch_task(vw=viewer, px=x_l0, py=y_l0, lv2=lv_j, g=gen, k=key):
+                # 视图已翻代（缩放/换层）就不再为旧视野预解码
+                if g != self._gen:
+                    self._prefetch_seen.discard(k)
+                    return
+                vw.read_tile(px, py, tile, lv2)
+
+            self.prefetch_exec.submit(prefetch_task)
+            count += 1
+
+    @Slot(object, int)
+    def _on_thumb_loaded(self, arr: object, seq: int):
+        if seq != self._open_seq:
+            # 过期打开请求的缩略图，丢弃，避免配上新片的尺寸
+            return
+        if arr is None or not isinstance(arr, np.ndarray) or not self.wsi_viewer:
+            self.overview.clear()
+            self.overview.hide()
+            return
+        h, w, _ = arr.shape
+        # fromImageInPlace 接管 QImage 而不是复制像素；QImage 只是包装
+        # numpy 缓冲，所以把数组钉在 self 上保证其活得比 QPixmap 久
+        self._thumb_arr = arr
+        qimg = QImage(arr.data, w, h, w * 3, QImage.Format_RGB888)
+        pix = QPixmap.fromImageInPlace(qimg, Qt.NoFormatConversion)
+        full_w, full_h = self.wsi_viewer.get_dimensions(0)
+        self.overview.set_overview(pix, (full_w, full_h))
+        self.overview.show()
+        self._update_overlays_geometry()
+        self._update_overview_rect()
+
+    @Slot(int, int, int, object, int)
+    def _on_tile_loaded(self, x: int, y: int, level: int, arr: object, gen: int):
+        key = _pack_tile_key(level, x, y)
+        self.pending_tasks.discard(key)
+        if arr is _EMPTY_TILE:
+            # 空白瓦片不建图元，场景背景刷补底色；判空结论与代际无关
+            self._empty_tiles.add(key)
+            return
+        if gen != self._gen:
+            return
+        if arr is None or not isinstance(arr, np.ndarray):
+            return
+        if not self.wsi_viewer or level != self.current_level:
+            return
+        if key in self.wsi_tile_items:
+            return
+
+        h, w, ch = arr.shape
+        if ch == 4:
+            # lowlevel 快路径给的就是预乘 ARGB，Qt 栅格绘制的原生格式
+            qimg = QImage(arr.data, w, h, w * 4, QImage.Format_ARGB32_Premultiplied)
+        else:
+            qimg = QImage(arr.data, w, h, w * 3, QImage.Format_RGB888)
+        # 原地接管，省掉每个瓦片一次整幅 memcpy；numpy 缓冲
+        # 钉在 pixmap 和 item 的 Python 包装上，二者都释放后才回收内存
+        pix = QPixmap.fromImageInPlace(qimg, Qt.NoFormatConversion)
+        pix._arr = arr
+        self.pixmap_cache.put(key, pix)
+        # 全局缓存必须存自持像素的深拷贝：原 pixmap 的像素在 numpy
+        # 缓冲里，生命期跟着本地缓存/图元走
+        QPixmapCache.insert(f"wsi:{self._slide_key}:{key}", pix.copy())
+        self._place_tile_item(key, pix, x, y, arr)
+        self._evict_far_tiles()
+
+    # ------------------------- 重载 resizeEvent：保持 overlay 位置 -------------------------
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # 视图大小变化时，重新布置 HUD / Overview / ScaleBar
+        self._refresh_view_scene_rect()
+        self._update_scale_bar_and_hud()
+
+    # ------------------------- 方向键平移 -------------------------
+    def keyPressEvent(self, event: QKeyEvent):
+        if not self.wsi_viewer:
+            return super().keyPressEvent(event)
+        step = 80
+        if event.key() == Qt.Key_Left:
+            self._queue_pan(step, 0)
+        elif event.key() == Qt.Key_Right:
+            self._queue_pan(-step, 0)
+        elif event.key() == Qt.Key_Up:
+            self._queue_pan(0, step)
+        elif event.key() == Qt.Key_Down:
+            self._queue_pan(0, -step)
+        else:
+            super().keyPressEvent(event)
+
+    def _queue_pan(self, dx: int, dy: int):
+        """长按方向键的连发事件只累积位移，由防抖定时器合并成一次刷新。"""
+        self._pending_pan_dx += dx
+        self._pending_pan_dy += dy
+        self.request_update()
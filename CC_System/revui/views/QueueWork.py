@@ -1,8 +1,9 @@
 import sys
 import time
 import os
+import queue
 import subprocess
-from PySide6.QtCore import Qt, QObject, Signal, QThread, QMutex, QMutexLocker
+from PySide6.QtCore import Qt, QObject, Signal, QThread
 from PySide6.QtGui import QFont, QPixmap, QAction
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QPushButton,
@@ -53,6 +54,7 @@ class ProcessingQueueWidget(QWidget):
     def __init__(self):
         super().__init__()
         self.queue_manager = QueueManager()
+        self._row_by_path = {}  # 处理表 file_path -> 行号，状态更新 O(1)
         self.init_ui()
         self.connect_signals()
 
@@ -175,7 +177,7 @@ class ProcessingQueueWidget(QWidget):
         file_path = file_path_item.text()
 
         open_action.triggered.connect(lambda: self.open_in_explorer(file_path))
-        remove_action.triggered.connect(lambda: table.removeRow(selected_row))
+        remove_action.triggered.connect(lambda: self._remove_row(table, selected_row))
         retry_action.triggered.connect(lambda: self.queue_manager.add_task(file_path))
 
         menu.addAction(open_action)
@@ -204,13 +206,30 @@ class ProcessingQueueWidget(QWidget):
 
     # === 文件操作逻辑 ===
     def add_files(self):
-        files, _ = QFileDialog.getOpenFileNames(self, "选择WSI文件", "", "WSI Files (*.ndpi *.svs *.tif)")
-        for file in files:
-            row = self.pending_table.rowCount()
-            self.pending_table.insertRow(row)
-            self.pending_table.setItem(row, 0, QTableWidgetItem(file))
-            self.pending_table.setItem(row, 1, QTableWidgetItem("等待中"))
-            self.pending_table.setItem(row, 2, QTableWidgetItem(time.strftime("%Y-%m-%d %H:%M:%S")))
+        # 原生对话框 + 不解析符号链接/只读：网络盘上的片库目录
+        # 浏览时少做大量 stat，打开明显更快
+        dlg = QFileDialog(self, "选择WSI文件", "", "WSI Files (*.ndpi *.svs *.tif)")
+        dlg.setOptions(QFileDialog.DontResolveSymlinks | QFileDialog.ReadOnly)
+        dlg.setFileMode(QFileDialog.ExistingFiles)
+        if not dlg.exec():
+            return
+        files = dlg.selectedFiles()
+        if not files:
+            return
+        # 一次选上百个文件时逐行 insertRow 会每行触发布局/重绘：
+        # 先停更新、预留行数，整批填完再恢复
+        table = self.pending_table
+        table.setUpdatesEnabled(False)
+        try:
+            start = table.rowCount()
+            table.setRowCount(start + len(files))
+            ts = time.strftime("%Y-%m-%d %H:%M:%S")
+            for i, file in enumerate(files):
+                table.setItem(start + i, 0, QTableWidgetItem(file))
+                table.setItem(start + i, 1, QTableWidgetItem("等待中"))
+                table.setItem(start + i, 2, QTableWidgetItem(ts))
+        finally:
+            table.setUpdatesEnabled(True)
 
     def confirm_selection(self):
         for row in range(self.pending_table.rowCount()):
@@ -230,22 +249,38 @@ class ProcessingQueueWidget(QWidget):
         self.processing_table.setItem(row, 0, QTableWidgetItem(file_path))
         self.processing_table.setItem(row, 1, QTableWidgetItem("等待处理"))
         self.processing_table.setItem(row, 2, QTableWidgetItem(time.strftime("%H:%M:%S")))
+        self._row_by_path[file_path] = row
+
+    def _set_processing_status(self, file_path, status):
+        row = self._row_by_path.get(file_path)
+        if row is not None:
+            self.processing_table.setItem(row, 1, QTableWidgetItem(status))
 
     def update_processing_status(self, file_path):
-        for row in range(self.processing_table.rowCount()):
-            if self.processing_table.item(row, 0).text() == file_path:
-                self.processing_table.setItem(row, 1, QTableWidgetItem("处理中"))
+        self._set_processing_status(file_path, "处理中")
 
     def handle_task_finished(self, file_path):
-        for row in range(self.processing_table.rowCount()):
-            if self.processing_table.item(row, 0).text() == file_path:
-                self.processing_table.setItem(row, 1, QTableWidgetItem("已完成"))
+        self._set_processing_status(file_path, "已完成")
+
+    def _remove_row(self, table, row):
+        table.removeRow(row)
+        if table is self.processing_table:
+            # 行号整体前移，按现表重建映射
+            self._row_by_path = {
+                table.item(r, 0).text(): r
+                for r in range(table.rowCount()) if table.item(r, 0)
+            }
 
     def clear_queue(self):
         self.processing_table.setRowCount(0)
+        self._row_by_path.clear()
         self.queue_manager.clear_queue()
 
 
+# 停止哨兵：放进队列让常驻 worker 退出
+_STOP = object()
+
+
 class QueueManager(QObject):
     task_added = Signal(str)
     task_started = Signal(str)
@@ -253,32 +288,46 @@ class QueueManager(QObject):
 
     def __init__(self):
         super().__init__()
-        self.queue = []
-        self.mutex = QMutex()
+        # queue.Queue 自带锁和阻塞 get：worker 空闲时睡在 get() 上，
+        # 不再是"队列一空就退出、下个任务重建线程"的模式
+        self.queue = queue.Queue()
         self.worker = None
-        self.running = False
+        self._stopping = False
+        # worker 常驻阻塞在 get() 上，退出前必须 stop()，否则 QThread
+        # 还在跑就被销毁会直接崩；挂在 aboutToQuit 上保证任何退出路径
+        # （窗口关闭、qApp.quit）都会走到
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop)
 
     def add_task(self, file_path):
-        with QMutexLocker(self.mutex):
-            self.queue.append(file_path)
-            self.task_added.emit(file_path)
-        self.start_processing()
-
-    def start_processing(self):
-        if not self.running:
-            self.running = True
+        self.task_added.emit(file_path)
+        self.queue.put(file_path)
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self.worker is None:
             self.worker = Worker(self)
             self.worker.task_started.connect(self.task_started.emit)
             self.worker.task_finished.connect(self.task_finished.emit)
-            self.worker.finished.connect(self.on_worker_finished)
             self.worker.start()
 
     def clear_queue(self):
-        with QMutexLocker(self.mutex):
-            self.queue.clear()
-
-    def on_worker_finished(self):
-        self.running = False
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def stop(self):
+        """结束常驻 worker（退出前调用）。未开始的任务直接丢弃，
+        最多只等正在处理的那一个，不让退出拖完整条队列。"""
+        if self.worker is not None:
+            self._stopping = True
+            self.clear_queue()
+            self.queue.put(_STOP)
+            self.worker.wait()
+            self.worker = None
 
 
 class Worker(QThread):
@@ -290,15 +339,23 @@ class Worker(QThread):
         self.queue_manager = queue_manager
 
     def run(self):
+        q = self.queue_manager.queue
         while True:
-            with QMutexLocker(self.queue_manager.mutex):
-                if not self.queue_manager.queue:
+            # 每次唤醒把已排队的任务一次取完，批量处理间不再进出锁
+            batch = [q.get()]  # 空闲时阻塞在这里，线程常驻
+            while True:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
                     break
-                file_path = self.queue_manager.queue.pop(0)
-
-            self.task_started.emit(file_path)
-            time.sleep(2)  # 模拟处理
-            self.task_finished.emit(file_path)
+            for file_path in batch:
+                # _stopping 也要看：clear_queue 清不掉已经取进本地
+                # batch 的任务
+                if file_path is _STOP or self.queue_manager._stopping:
+                    return
+                self.task_started.emit(file_path)
+                time.sleep(2)  # 模拟处理
+                self.task_finished.emit(file_path)
 
 
 class QueueWork(QMainWindow):
@@ -1,4 +1,9 @@
+import os
 import sys
+
+# 抽屉/遮罩/角标按钮彼此不需要不透明兄弟裁剪，关掉省一轮重绘计算
+os.environ.setdefault("QT_NO_SUBTRACTOPAQUESIBLINGS", "1")
+
 from PySide6.QtCore import QEvent
 from PySide6.QtGui import QGuiApplication
 from PySide6.QtWidgets import QApplication, QWidget, QStackedWidget, QVBoxLayout, QDialog